@@ -1,14 +1,23 @@
 import streamlit as st
-import streamlit.components.v1 as components
 import google.generativeai as genai
 from PIL import Image
-import io
 import os
-import pdfplumber
 import json
+from utils.gemini import DEFAULT_RPM, DEFAULT_CONCURRENCY, DEFAULT_PAGES_PER_REQUEST, GEMINI_MODEL, TokenBucket
+from functools import partial
+from utils.extract import extract_document, join_pages, ocr_pdf_pages, plan_pdf_pages
+from utils.cache import PageCache, content_hash
+from utils.pdf import PdfDocument, RenderSettings
+from utils.corpus import get_corpus
+from utils import jobs
+from utils.trace import span
+from utils.job_panel import job_panel, job_status
+from utils.trace_panel import trace_panel
 
 st.set_page_config(page_title="Data‑Vista", layout="wide")
 st.title("Data‑Vista: Smart Notes Visualizer 🚀")
+trace_panel()
+job_panel()
 
 # Initialize Gemini
 @st.cache_resource
@@ -20,10 +29,25 @@ def init_gemini():
         st.stop()
     genai.configure(api_key=api_key)
     # Use gemini-1.5-flash for better free tier support
-    return genai.GenerativeModel('gemini-2.0-flash')
+    return genai.GenerativeModel(GEMINI_MODEL)
 
 model = init_gemini()
 
+RENDER = RenderSettings()
+
+@st.cache_resource
+def get_limiter():
+    """One request budget for the API key, shared by every session and extraction job"""
+    return TokenBucket(DEFAULT_RPM)
+
+@st.cache_resource
+def get_page_cache():
+    """Persistent per-page extraction cache shared by all sessions"""
+    try:
+        return PageCache()
+    except Exception:
+        return None  # read-only filesystem etc.; extraction still works uncached
+
 # Session state
 for key, default in [
     ("text", ""), ("keywords", []), ("entities", []), ("topics", None),
@@ -37,154 +61,71 @@ Upload your study notes in any format - typed documents, PDFs, or even handwritt
 Gemini's multimodal AI will intelligently extract and understand your content.
 """)
 
-def log_to_console(message: str, data: str = ""):
-    """Log messages to browser console for debugging"""
-    try:
-        # Escape and truncate data for safe JSON embedding
-        safe_data = data.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")[:500]
-        
-        js_code = f"""
-        <script>
-        console.log("[Data-Vista] {message}");
-        console.log("[Data-Vista] Response preview:", "{safe_data}...");
-        console.log("[Data-Vista] Full length:", {len(data)} + " characters");
-        </script>
-        """
-        components.html(js_code, height=0)
-    except Exception as e:
-        # Silent fail - don't break app if logging fails
-        pass
-
-def get_pdf_page_count(pdf_file) -> int:
-    """Get total page count of PDF"""
+@st.cache_resource(max_entries=8)
+def load_pdf_document(file_hash: str, _uploaded_file):
+    """Parse a PDF once per distinct upload, shared across reruns and sessions"""
     try:
-        pdf_file.seek(0)
-        with pdfplumber.open(pdf_file) as pdf:
-            return len(pdf.pages)
+        return PdfDocument(_uploaded_file.getvalue(), file_hash)
     except Exception:
-        return 0
+        return None
 
-def extract_pdf_pages_as_images(pdf_file, start_page: int, end_page: int):
-    """Extract specific pages from PDF as images for Gemini"""
-    try:
-        pdf_file.seek(0)
-        images = []
-        
-        with pdfplumber.open(pdf_file) as pdf:
-            total_pages = len(pdf.pages)
-            start = max(0, start_page - 1)  # Convert to 0-indexed
-            end = min(total_pages, end_page)
-            
-            for page_num in range(start, end):
-                page = pdf.pages[page_num]
-                # Convert page to image
-                img = page.to_image(resolution=150)
-                pil_img = img.original
-                images.append(pil_img)
-        
-        return images
-    except Exception as e:
-        st.error(f"Error extracting PDF pages: {str(e)}")
-        return []
+def get_pdf_document(uploaded_file):
+    """Document handle for an upload; the bytes are hashed only once per upload"""
+    hashes = st.session_state.setdefault("pdf_hashes", {})
+    file_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+    if file_id not in hashes:
+        hashes[file_id] = content_hash(uploaded_file.getvalue())
+    return load_pdf_document(hashes[file_id], uploaded_file)
 
-def extract_with_gemini(uploaded_file, start_page=None, end_page=None) -> str:
-    """Extract text from any document using Gemini's multimodal capabilities"""
-    try:
-        name = uploaded_file.name.lower()
-        
-        # For images (including handwritten notes)
-        if name.endswith(('.png', '.jpg', '.jpeg')):
-            img = Image.open(uploaded_file)
-            st.image(img, caption="🖼️ Uploaded Image", use_container_width=True)
-            
-            with st.spinner("🤖 Gemini is reading your document..."):
-                response = model.generate_content([
-                    "Extract ALL text from this image. If it contains handwritten notes, transcribe them accurately. "
-                    "Preserve the structure and formatting. Return only the extracted text without any additional commentary.",
-                    img
-                ])
-                log_to_console("Image processed", response.text)
-                return response.text
-        
-        # For PDFs with page selection
-        elif name.endswith('.pdf'):
-            pdf_file = io.BytesIO(uploaded_file.read())
-            total_pages = get_pdf_page_count(pdf_file)
-            
-            if total_pages == 0:
-                st.error("Could not read PDF file")
-                return ""
-            
+def extraction_job(job, name, data, doc=None, start_page=None, end_page=None, use_text_layer=True,
+                   render=RENDER, cache=None, pages_per_request=DEFAULT_PAGES_PER_REQUEST, limiter=None) -> dict:
+    """Extract text from any document using Gemini's multimodal capabilities.
+
+    Runs on the background job queue, so it makes no Streamlit calls; progress goes through `job`.
+    """
+    with span("extract", "stage", file=name):
+        note = ""
+        if name.lower().endswith('.pdf'):
             # Use provided page range or default to all pages
             start = start_page if start_page else 1
-            end = end_page if end_page else total_pages
-            
-            with st.spinner(f"🤖 Gemini is processing pages {start}-{end} of your PDF..."):
-                # Extract pages as images
-                page_images = extract_pdf_pages_as_images(pdf_file, start, end)
-                
-                if not page_images:
-                    return ""
-                
-                # Process each page with Gemini
-                all_text = []
-                progress_bar = st.progress(0)
-                
-                for idx, img in enumerate(page_images):
-                    page_num = start + idx
-                    st.write(f"📄 Processing page {page_num}...")
-                    
-                    response = model.generate_content([
-                        f"Extract ALL text from this PDF page (page {page_num}). "
-                        "Preserve structure, headings, and formatting. "
-                        "If there are tables, preserve their structure. "
-                        "Return only the extracted text.",
-                        img
-                    ])
-                    
-                    log_to_console(f"PDF page {page_num} processed", response.text)
-                    all_text.append(f"\n--- Page {page_num} ---\n{response.text}")
-                    progress_bar.progress((idx + 1) / len(page_images))
-                
-                progress_bar.empty()
-                return "\n".join(all_text)
-        
-        # For DOCX
-        elif name.endswith('.docx'):
-            with st.spinner("🤖 Gemini is processing your document..."):
-                uploaded_file.seek(0)
-                uploaded_doc = genai.upload_file(uploaded_file, mime_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
-                
-                response = model.generate_content([
-                    "Extract ALL text content from this DOCX document. "
-                    "Preserve headings, paragraphs, and structure. "
-                    "Return only the extracted text.",
-                    uploaded_doc
-                ])
-                
-                log_to_console("DOCX processed", response.text)
-                genai.delete_file(uploaded_doc.name)
-                return response.text
-        
-        # For TXT files
-        elif name.endswith('.txt'):
-            uploaded_file.seek(0)
-            raw = uploaded_file.read()
-            for enc in ("utf-8", "utf-16", "latin-1"):
-                try:
-                    return raw.decode(enc)
-                except Exception:
-                    continue
-            return ""
-        
+            end = end_page if end_page else doc.page_count
+
+            # Born-digital pages are read from the PDF text layer; only the rest need vision OCR
+            texts, keys, missing, local = plan_pdf_pages(doc, start, end, use_text_layer, render, cache)
+            cached = len(texts)
+            note = f"📝 {local} from the text layer · ♻️ {cached - local} cached · 🤖 {len(missing)} by Gemini OCR"
+            job.progress(0, len(missing), note)
+
+            if missing:
+                def on_page(page_num, text):
+                    job.progress(len(texts) - cached, message=f"📄 Processed page {page_num} of {start}-{end}")
+
+                sent_bytes = ocr_pdf_pages(
+                    model, doc, missing, keys, texts, render, cache,
+                    on_page=on_page,
+                    rpm=DEFAULT_RPM,
+                    max_workers=DEFAULT_CONCURRENCY,
+                    pages_per_request=pages_per_request,
+                    limiter=limiter,
+                )
+                note += f" · 📦 uploaded {sum(sent_bytes) / 1024:,.0f} KB in {len(sent_bytes)} page image(s)"
+            text = join_pages(texts)
         else:
-            st.error(f"Unsupported file type: {name}")
-            return ""
-            
-    except Exception as e:
-        st.error(f"❌ Error processing document: {str(e)}")
-        st.info("💡 Tip: Make sure your GEMINI_API_KEY is valid and you haven't exceeded rate limits")
-        return ""
+            job.progress(0, 1, "🤖 Gemini is reading your document...")
+            text = extract_document(name, data, model, files=genai, limiter=limiter)
+    # Stats are computed once here, not on every rerun of the page
+    stats = {"chars": len(text), "words": len(text.split()), "lines": text.count("\n") + 1}
+    return {"text": text, "note": note, "stats": stats}
+
+def add_extracted(session_state, result, name, keep):
+    """Apply a finished extraction job to the session's corpus"""
+    corpus = get_corpus(session_state)
+    if not result["text"]:
+        return
+    if not keep:
+        corpus.clear()
+    corpus.add(name, result["text"])
+    session_state.text = corpus.text
 
 # File uploader
 uploaded = st.file_uploader(
@@ -196,12 +137,14 @@ uploaded = st.file_uploader(
 # Page selection for PDFs
 start_page = None
 end_page = None
+use_text_layer = True
+render = RENDER
+pages_per_request = DEFAULT_PAGES_PER_REQUEST
 
 if uploaded and uploaded.name.lower().endswith('.pdf'):
     # Get page count
-    pdf_bytes = io.BytesIO(uploaded.read())
-    total_pages = get_pdf_page_count(pdf_bytes)
-    uploaded.seek(0)  # Reset for later processing
+    doc = get_pdf_document(uploaded)
+    total_pages = doc.page_count if doc else 0
     
     if total_pages > 0:
         st.info(f"📄 PDF has {total_pages} pages")
@@ -223,56 +166,149 @@ if uploaded and uploaded.name.lower().endswith('.pdf'):
                 min_value=1,
                 max_value=total_pages,
                 value=min(10, total_pages),  # Default to first 10 pages
-                help="Last page to process (max recommended: 20 pages)"
+                help="Last page to process"
             )
         
         with col3:
             st.metric("Pages", f"{end_page - start_page + 1}")
         
+        use_text_layer = st.checkbox(
+            "Use embedded PDF text when available",
+            value=True,
+            help="Born-digital pages are read locally; only scanned or handwritten pages are sent to Gemini"
+        )
+        if st.checkbox("Send pages in grayscale", value=False, help="Smaller uploads; fine for most printed or handwritten notes"):
+            render = RenderSettings(grayscale=True)
+        pages_per_request = st.slider(
+            "Pages per Gemini request",
+            1, 8, DEFAULT_PAGES_PER_REQUEST,
+            help="Several page images share one request, so far fewer requests count against the per-minute limit. "
+                 "Batches whose answer cannot be split back into pages are redone one page at a time."
+        )
+
         if end_page < start_page:
             st.warning("⚠️ End page must be >= start page")
-        elif (end_page - start_page + 1) > 20:
-            st.warning("⚠️ Processing more than 20 pages may hit rate limits. Consider splitting into smaller batches.")
+        else:
+            # Upper bound: pages with embedded text or already cached need no request
+            requests = -(-(end_page - start_page + 1) // pages_per_request)
+            if requests > 20:
+                st.warning(f"⚠️ Up to {requests} Gemini requests, about {requests / DEFAULT_RPM:.0f} min at "
+                           f"{DEFAULT_RPM} requests/minute. More pages per request or a smaller range is faster.")
+
+corpus = get_corpus(st.session_state)
 
 # Process button
 if uploaded:
+    add_to_corpus = st.checkbox(
+        "➕ Add to corpus (keep previously processed documents)",
+        value=len(corpus) > 0,
+        help="Analyze many documents together; only the new document is indexed"
+    )
     if st.button("🚀 Process Document", type="primary", use_container_width=True):
-        with st.status("Processing document...", expanded=True) as status:
-            st.write("📄 Reading file...")
-            text = extract_with_gemini(uploaded, start_page, end_page)
-            
-            if text:
-                st.session_state.text = text
-                status.update(label="✅ Document processed successfully!", state="complete", expanded=False)
-                
-                # Show extraction stats
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Characters", f"{len(text):,}")
-                with col2:
-                    st.metric("Words", f"{len(text.split()):,}")
-                with col3:
-                    st.metric("Lines", f"{text.count(chr(10)) + 1:,}")
-            else:
-                status.update(label="❌ Failed to process document", state="error")
+        name = uploaded.name
+        if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+            st.image(Image.open(uploaded), caption="🖼️ Uploaded Image", use_container_width=True)
+        doc = get_pdf_document(uploaded) if name.lower().endswith('.pdf') else None
+        if name.lower().endswith('.pdf') and not (doc and doc.page_count):
+            st.error("Could not read PDF file")
+        else:
+            data = uploaded.getvalue()
+            file_hash = doc.hash if doc else content_hash(data)
+            # Same file, pages and settings: the running or finished job is reused
+            key = content_hash("extract", file_hash, name, str(start_page), str(end_page), str(use_text_layer),
+                               render.signature, str(pages_per_request), GEMINI_MODEL)
+            jobs.start(
+                st.session_state, "extract", key, f"Extract {name}", extraction_job,
+                name, data, doc, start_page, end_page, use_text_layer, render, get_page_cache(), pages_per_request,
+                get_limiter(),
+                on_done=partial(add_extracted, name=name, keep=add_to_corpus),
+            )
+            jobs.apply_finished(st.session_state)  # already extracted earlier: apply right away
+
+    # Extraction runs in the background: other pages can be opened meanwhile
+    job = job_status("extract")
+    if job and job.state == "done":
+        stats = job.result["stats"]
+        if job.result["text"]:
+            st.success("✅ Document processed successfully!")
+            if job.result["note"]:
+                st.caption(job.result["note"])
+
+            # Show extraction stats
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Characters", f"{stats['chars']:,}")
+            with col2:
+                st.metric("Words", f"{stats['words']:,}")
+            with col3:
+                st.metric("Lines", f"{stats['lines']:,}")
+        else:
+            st.error("❌ Failed to process document")
+    elif job and job.state == "failed":
+        st.info("💡 Tip: Make sure your GEMINI_API_KEY is valid and you haven't exceeded rate limits")
+
+# Corpus
+if len(corpus) > 1:
+    with st.expander(f"📚 Corpus: {len(corpus)} documents, {corpus.words:,} keywords", expanded=False):
+        for doc_id, name, words in corpus.documents():
+            c1, c2 = st.columns([5, 1])
+            c1.write(f"**{name}** · {words:,} keywords")
+            if c2.button("Remove", key=f"remove_{doc_id}"):
+                corpus.remove(doc_id)
+                st.session_state.text = corpus.text
+                st.rerun()
 
 # Text preview
 if st.session_state.text:
     st.subheader("📄 Extracted Text Preview")
     
+    docs = corpus.documents()
+    d = 0
+    if len(docs) > 1:
+        # By position: an edited document keeps its place but gets a new id
+        d = st.selectbox("Document", range(len(docs)), key="preview_doc",
+                         format_func=lambda n: f"{docs[n][1]} ({docs[n][2]:,} keywords)")
+    doc_id = docs[min(d, len(docs) - 1)][0]
+    doc = corpus.get(doc_id)
+
+    # Only one page is sent to the browser per rerun, whatever the document size
+    pages = doc.pages
+    i = 0
+    if len(pages) > 1:
+        # An edit can re-window a page into fewer parts: keep the remembered page in range
+        page_key = f"preview_page_{doc_id}"
+        if st.session_state.get(page_key, 0) >= len(pages):
+            st.session_state[page_key] = len(pages) - 1
+        c1, c2 = st.columns([3, 2])
+        i = c1.selectbox(
+            "Page",
+            range(len(pages)),
+            format_func=lambda n: f"{pages[n].label} · {pages[n].words:,} words",
+            key=page_key,
+        )
+        c2.caption(f"{len(pages)} pages · {sum(p.words for p in pages):,} words · {len(doc.text):,} characters")
+    page = pages[i]
+
     # Option to edit extracted text
     edited_text = st.text_area(
         "Review and edit if needed:",
-        st.session_state.text,
+        page.body,
         height=300,
-        key="preview_text",
+        key=f"preview_text_{doc_id}_{i}",
         help="You can edit the extracted text before analyzing"
     )
     
-    if edited_text != st.session_state.text:
+    if edited_text != page.body:
         if st.button("💾 Save Changes"):
-            st.session_state.text = edited_text
-            st.success("✅ Changes saved!")
+            # Only the edited page is replaced and only its document re-indexed
+            try:
+                new_id = corpus.replace_page(doc_id, i, edited_text)
+            except ValueError as e:
+                st.warning(f"⚠️ Not saved: {e}")
+            else:
+                st.session_state[f"preview_page_{new_id}"] = min(i, len(corpus.get(new_id).pages) - 1)
+                st.session_state.text = corpus.text
+                st.success("✅ Changes saved!")
     
     st.divider()
     
@@ -306,9 +342,9 @@ else:
         - Researchers analyzing papers
         - Anyone organizing knowledge from documents
         
-        **💡 Pro Tip**: For large PDFs, process 10-20 pages at a time to avoid rate limits!
+        **💡 Pro Tip**: Pages are batched several per request to stay within rate limits, and processed pages are cached, so large PDFs can be done in parts!
         """)
 
 # Footer
 st.divider()
-st.caption("Powered by Google Gemini 1.5 Flash • Built with Streamlit • Check browser console (F12) for AI response logs")
+st.caption("Powered by Google Gemini 1.5 Flash • Built with Streamlit • Stage timings in the sidebar ⏱️ Performance panel")
@@ -0,0 +1,304 @@
+"""Per-stage timings on synthetic notes, written to JSON for comparison across commits.
+
+    python -m benchmarks.stages --sizes 1000,10000,100000,1000000 --out bench_results.json
+    python -m benchmarks.stages --sizes 10000 --stages extract --latency 0.5
+    python -m benchmarks.stages --compare old.json --out new.json
+
+Every stage is timed cold: the in-process caches it would normally hit (text analysis,
+TF-IDF, layouts, word-cloud layouts, summary memo) are cleared before each repeat.
+Extraction runs against StubModel with the given latency instead of Gemini; the
+summarizer uses a tiny local model and is skipped above --summary-max-words.
+"""
+import argparse
+import importlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+STAGES = ("clean", "tokenize", "analyze", "topic_model", "concept_graph", "layout",
+          "chunk_text", "token_chunks", "summarize", "word_cloud", "pdf_vector", "pdf_raster", "extract")
+
+TOPIC_WORDS = [
+    "photosynthesis chloroplast chlorophyll light glucose carbon oxygen enzyme membrane energy".split(),
+    "market demand supply price inflation interest policy currency trade growth".split(),
+    "neuron synapse cortex memory signal receptor brain learning plasticity dopamine".split(),
+    "algorithm graph vertex edge complexity recursion sorting heap queue matrix".split(),
+    "empire treaty revolution monarchy parliament colony war reform trade dynasty".split(),
+]
+FILLER = "the of and to in is that for it with as was on are by this be from at or an".split()
+
+
+def make_corpus(n_words: int, seed: int = 0, words_per_page: int = 400) -> str:
+    """Deterministic notes-like text: topical paragraphs, a Zipf-ish long tail, page markers"""
+    rng = random.Random(seed)
+    tail = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10))) for _ in range(5000)]
+    cum = list(itertools.accumulate(1.0 / (i + 1) for i in range(len(tail))))
+    out, words, page = [], 0, 1
+    out.append(f"\n--- Page {page} ---\n")
+    while words < n_words:
+        topic = rng.choice(TOPIC_WORDS)
+        for _ in range(rng.randint(3, 6)):
+            n = rng.randint(8, 20)
+            sent = []
+            for _ in range(n):
+                r = rng.random()
+                sent.append(rng.choice(topic) if r < 0.35 else rng.choice(FILLER) if r < 0.7
+                            else rng.choices(tail, cum_weights=cum)[0])
+            sent[0] = sent[0].capitalize()
+            out.append(" ".join(sent) + ". ")
+            words += n
+        out.append("\n\n")
+        if words >= page * words_per_page:
+            page += 1
+            out.append(f"\n--- Page {page} ---\n")
+    return "".join(out)
+
+
+def make_pdf(text: str, max_pages: int) -> bytes:
+    """A PDF whose pages carry the corpus pages as a text layer"""
+    import textwrap
+    from reportlab.pdfgen import canvas
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    pages = [p for p in text.split("--- Page ") if p.strip()][:max_pages]
+    for page in pages:
+        y = 800
+        c.setFont("Helvetica", 9)
+        for line in textwrap.wrap(page.split("---", 1)[-1], 110)[:70]:
+            c.drawString(40, y, line)
+            y -= 11
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+STAGE_MODULES = ("utils.text", "utils.topics", "utils.graph", "utils.nlp", "utils.summarize", "utils.charts",
+                 "utils.pdf_charts", "utils.report", "utils.extract", "transformers")
+
+
+def preload():
+    """Import stage modules up front so first-run timings do not include import cost"""
+    for name in STAGE_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def clear_caches():
+    from utils.text import _ANALYSES
+    _ANALYSES.clear()
+    for module, name in (("utils.topics", "_TFIDF"), ("utils.topics", "_SWEEPS"),
+                         ("utils.graph", "_LAYOUTS"), ("utils.charts", "_WORD_CLOUDS")):
+        if module in sys.modules:
+            getattr(sys.modules[module], name).clear()
+
+
+def timed(fn, repeat: int, setup=None):
+    """(median seconds, min seconds, last result) over `repeat` cold runs"""
+    times, result = [], None
+    for _ in range(repeat):
+        clear_caches()
+        args = setup() if setup else ()
+        t0 = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), min(times), result
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        self._summarizer = None
+
+    def record(self, stage, words, fn, repeat=None, setup=None, extra=None):
+        if stage not in self.args.stages:
+            return None
+        try:
+            median, best, result = timed(fn, repeat or self.args.repeat, setup)
+            row = {"stage": stage, "words": words, "seconds": round(median, 5), "min_seconds": round(best, 5),
+                   "words_per_s": round(words / median) if median else None}
+            row.update(extra(result) if extra else {})
+        except ImportError as e:
+            row, result = {"stage": stage, "words": words, "skipped": f"missing dependency: {e.name}"}, None
+        except Exception as e:
+            row, result = {"stage": stage, "words": words, "error": f"{type(e).__name__}: {e}"}, None
+        self.results.append(row)
+        print(json.dumps(row), flush=True)
+        return result
+
+    def summarizer(self):
+        if self._summarizer is None:
+            from utils.summarize import load_summarizer
+            self._summarizer = load_summarizer(self.args.summary_model)
+        return self._summarizer
+
+    def run_size(self, n):
+        from utils.text import analyze, basic_clean, tokenize
+        text = make_corpus(n, seed=self.args.seed)
+        self.record("clean", n, lambda: basic_clean(text))
+        self.record("tokenize", n, lambda: tokenize(text), extra=lambda toks: {"tokens": len(toks)})
+        self.record("analyze", n, lambda: analyze(text))
+        analysis = analyze(text)
+
+        def topics():
+            from utils.topics import topic_model
+            return topic_model(text, 5)
+
+        topic_res = self.record("topic_model", n, topics, repeat=max(1, self.args.repeat // 2))
+
+        def graph():
+            from utils.graph import build_concept_graph, prune_graph
+            return prune_graph(build_concept_graph(analysis.tokens, topic_res, counts=analysis.counts))
+
+        G = self.record("concept_graph", n, graph,
+                        extra=lambda g: {"nodes": g.number_of_nodes(), "edges": g.number_of_edges()})
+        pos = None
+        if G is not None:
+            from utils.graph import layout_graph
+            pos = self.record("layout", n, lambda: layout_graph(G))
+
+        def chunks():
+            from utils.text import chunk_text
+            return chunk_text(text)
+
+        self.record("chunk_text", n, chunks, extra=lambda c: {"chunks": len(c)})
+        if n <= self.args.summary_max_words:
+            from utils.cache import LRUCache
+            from utils.summarize import map_reduce_summary, token_chunks
+            self.record("token_chunks", n, lambda: token_chunks(text, self.summarizer().tokenizer),
+                        extra=lambda c: {"chunks": len(c)})
+            self.record("summarize", n, lambda: map_reduce_summary(self.summarizer(), text, max_len=60, memo=LRUCache(4096)),
+                        repeat=1, extra=lambda r: {"partials": len(r[1])})
+
+        freqs = tuple(analysis.counts.most_common(150))
+        word_freq = analysis.counts.most_common(25)
+
+        def cloud():
+            from utils.charts import word_cloud_png
+            return word_cloud_png(freqs, 200)
+
+        self.record("word_cloud", n, cloud, extra=lambda png: {"bytes": len(png)})
+        pie = None
+        if topic_res:
+            pie = ([f"Topic {i+1}: " + ", ".join(t[:4]) for i, t in enumerate(topic_res["topic_terms"])],
+                   [float(w) for w in topic_res["topic_weights"]])
+
+        def pdf(vector):
+            from reportlab.lib.units import cm
+            from utils.charts import render_png, EXPORT_DPI
+            from utils.pdf_charts import raster_dpi, vector_drawing
+            from utils.report import CONTENT_W, build_report
+            charts = [("Keyword Frequency", "keyword_freq", word_freq, 9*cm), ("Word Cloud", "word_cloud", freqs, 9*cm)]
+            if pie:
+                charts.append(("Topic Distribution", "topic_pie", pie, 9*cm))
+            if G is not None and pos is not None:
+                charts.append(("Concept Graph", "concept_graph", (G, pos), 11*cm))
+            built = []
+            for title, kind, data, max_h in charts:
+                if vector and kind != "word_cloud":
+                    built.append((title, vector_drawing(kind, data, CONTENT_W, max_h), max_h))
+                else:
+                    dpi = raster_dpi(CONTENT_W, max_h) if vector else EXPORT_DPI[kind]
+                    built.append((title, render_png(kind, data, dpi), max_h))
+            return build_report(summary=" ".join(text.split()[:150]), entities=[], charts=built)
+
+        self.record("pdf_vector", n, lambda: pdf(True), extra=lambda b: {"bytes": len(b)})
+        self.record("pdf_raster", n, lambda: pdf(False), extra=lambda b: {"bytes": len(b)})
+
+        def extract_setup():
+            from utils.gemini import StubModel
+            return (StubModel(latency=self.args.latency, jitter=self.args.latency / 2, seed=self.args.seed),)
+
+        pages = min(self.args.extract_pages, max(1, n // 400))
+
+        def extract(model):
+            from utils.extract import extract_document
+            from utils.pdf import RenderSettings
+            return model, extract_document("bench.pdf", self._pdf, model, use_text_layer=False, render=RenderSettings(),
+                                           cache=None, rpm=self.args.rpm, max_workers=self.args.page_workers,
+                                           pages_per_request=self.args.pages_per_request)
+
+        if "extract" in self.args.stages:
+            try:
+                self._pdf = make_pdf(text, pages)
+            except ImportError:
+                self._pdf = None
+            if self._pdf:
+                self.record("extract", n, extract, repeat=1, setup=extract_setup,
+                            extra=lambda r: {"pages": pages, "calls": r[0].calls, "latency": self.args.latency,
+                                                  "pages_per_request": self.args.pages_per_request})
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(old_path, results):
+    """Print new/old time ratios per (stage, words); > 1 is slower"""
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["stage"], r["words"]): r for r in json.load(f)["results"] if "seconds" in r}
+    print(f"{'stage':<14}{'words':>9}{'old s':>10}{'new s':>10}{'ratio':>8}")
+    for r in results:
+        prev = old.get((r["stage"], r["words"]))
+        if prev and "seconds" in r and prev["seconds"]:
+            print(f"{r['stage']:<14}{r['words']:>9}{prev['seconds']:>10.4f}{r['seconds']:>10.4f}"
+                  f"{r['seconds'] / prev['seconds']:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Corpus sizes in words")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub Gemini seconds per request")
+    parser.add_argument("--rpm", type=float, default=6000, help="Rate limit for the stub (requests per minute)")
+    parser.add_argument("--page-workers", type=int, default=4)
+    parser.add_argument("--pages-per-request", type=int, default=1, help="PDF pages per stub request")
+    parser.add_argument("--extract-pages", type=int, default=20, help="Max PDF pages for the extraction stage")
+    parser.add_argument("--summary-model", default="sshleifer/bart-tiny-random")
+    parser.add_argument("--summary-max-words", type=int, default=20000)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args(argv)
+    args.stages = {s.strip() for s in args.stages.split(",") if s.strip()}
+    unknown = args.stages - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    preload()
+    bench = Bench(args)
+    for n in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        bench.run_size(n)
+
+    doc = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {k: sorted(v) if isinstance(v, set) else v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": bench.results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    print(f"Wrote {len(bench.results)} result(s) to {args.out}")
+    if args.compare:
+        compare(args.compare, bench.results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Latency and memory per chunk for the fp32 and int8 summarizer modes.
+
+    python -m benchmarks.summarizer_modes --model sshleifer/distilbart-cnn-12-6 --chunks 4
+
+Each mode runs in a fresh process so peak RSS is not shared between them.
+Prints one JSON object per mode, plus the int8 vs fp32 summary parity.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import sys
+import time
+
+from utils.summarize import load_summarizer, model_bytes, summarize_texts, summary_parity, token_chunks
+
+SAMPLE = (
+    "Photosynthesis converts light energy into chemical energy stored in glucose. "
+    "It takes place in the chloroplasts of plant cells, where chlorophyll absorbs mostly blue and red light. "
+    "The light-dependent reactions split water, release oxygen and produce ATP and NADPH. "
+    "The Calvin cycle then uses that ATP and NADPH to fix carbon dioxide into three-carbon sugars. "
+)
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_mode(model_name, fast, n_chunks, max_len, queue):
+    t0 = time.perf_counter()
+    summarizer = load_summarizer(model_name, fast=fast)
+    load_s = time.perf_counter() - t0
+    text = SAMPLE * (40 * n_chunks)
+    chunks = token_chunks(text, summarizer.tokenizer)[:n_chunks]
+    summarize_texts(summarizer, chunks[:1], max_len, max(30, max_len // 3))  # warm-up
+    latencies, outputs = [], []
+    for ch in chunks:
+        t = time.perf_counter()
+        outputs.extend(summarize_texts(summarizer, [ch], max_len, max(30, max_len // 3)))
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+    queue.put({
+        "mode": "int8" if fast else "fp32",
+        "threads": {"intra": summarizer.threads[0], "inter": summarizer.threads[1]},
+        "model": model_name,
+        "chunks": len(chunks),
+        "load_s": round(load_s, 3),
+        "latency_mean_s": round(sum(latencies) / len(latencies), 3),
+        "latency_p50_s": round(latencies[len(latencies) // 2], 3),
+        "weights_mb": round(model_bytes(summarizer.model) / 2 ** 20, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "outputs": outputs,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="sshleifer/distilbart-cnn-12-6")
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--max-len", type=int, default=150)
+    args = parser.parse_args(argv)
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for fast in (False, True):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_mode, args=(args.model, fast, args.chunks, args.max_len, queue))
+        proc.start()
+        res = queue.get()
+        proc.join()
+        results[res["mode"]] = res
+
+    parity = [summary_parity(a, b) for a, b in zip(results["fp32"]["outputs"], results["int8"]["outputs"])]
+    for res in results.values():
+        res.pop("outputs")
+        print(json.dumps(res))
+    print(json.dumps({"parity_unigram_f1": round(sum(parity) / max(1, len(parity)), 3)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,39 @@
+import os
 import streamlit as st
 from textblob import TextBlob
-import spacy
+from utils.nlp import load_ner, extract_entities
+from utils.job_panel import job_panel
+from utils.trace_panel import trace_panel
 
 st.set_page_config(layout="wide")
 st.title("🧠 NLP Analysis")
+trace_panel()
+job_panel()
 
 if not st.session_state.text:
     st.warning("Please upload text on Home."); st.stop()
 
-nlp = spacy.load("en_core_web_sm")
+@st.cache_resource
+def get_ner(model_name="en_core_web_sm"):
+    # Cached so we don’t reload weights on each run; NER only, no parser/lemmatizer
+    return load_ner(model_name)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_entities(text, batch_size, n_process):
+    return extract_entities(get_ner(), text, batch_size=batch_size, n_process=n_process)
+
+with st.expander("⚙️ Performance", expanded=False):
+    batch_size = st.slider("Chunks per batch", 1, 64, 8)
+    n_process = st.slider("Worker processes", 1, os.cpu_count() or 1, 1,
+                          help="Use more than one for book-length notes on a multi-core machine")
 
 if st.button("Run Analysis"):
     sentiment = TextBlob(st.session_state.text).sentiment
     st.write(f"Polarity: {sentiment.polarity:.2f}")
     st.write(f"Subjectivity: {sentiment.subjectivity:.2f}")
-    doc = nlp(st.session_state.text)
-    ents = [(e.text, e.label_) for e in doc.ents][:50]
+    with st.spinner("Extracting entities..."):
+        spans = get_entities(st.session_state.text, batch_size, n_process)
+    ents = [(t, l) for t, l, _, _ in spans][:50]
     st.session_state.entities = ents
-    st.write("Named Entities (first 50):")
+    st.write(f"Named Entities (first 50 of {len(spans):,}):")
     st.write(ents)
@@ -1,74 +1,88 @@
 import streamlit as st
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import NMF
-from sklearn.preprocessing import normalize
-from scipy import sparse
-import re
+from utils.corpus import get_corpus
+from utils.topics import sweep_pool, sweep_tfidf, SWEEP_KS
 import plotly.express as px
-import matplotlib.pyplot as plt
+from utils.cache import content_hash
+from utils.artifacts import Artifact
+from utils.job_panel import job_panel, job_status
+from utils.trace_panel import trace_panel
+from utils import jobs
+from functools import partial
 
 
 st.set_page_config(layout="wide")
 st.title("🧩 Topic Modeling")
-
-
-def topic_model(text, n_topics=5, max_features=5000):
-    def basic_clean(s):
-        s = re.sub(r"\s+", " ", s)
-        s = re.sub(r"[^\x09\x0A\x0D\x20-\x7E]", " ", s)
-        return s.strip()
-    docs = re.split(r"(?<=[.!?])\s+", basic_clean(text))
-    docs = [d for d in docs if len(d.split()) >= 5]
-    if len(docs) < 3: return None
-    vec = TfidfVectorizer(max_features=max_features, stop_words="english")
-    nmf = NMF(n_components=min(n_topics, max(2, len(docs)//2)), random_state=42, init="nndsvda", max_iter=400)
-    X = vec.fit_transform(docs)
-    if X.shape[0] < 2 or X.shape[1] < 2: return None
-    W = nmf.fit_transform(X); H = nmf.components_; feats = vec.get_feature_names_out()
-    topic_terms = [[feats[i] for i in comp.argsort()[::-1][:8]] for comp in H]
-    doc_topic = normalize(W, norm="l1", axis=1)
-    if sparse.issparse(doc_topic): weights = doc_topic.mean(axis=0).A1
-    else: weights = doc_topic.mean(axis=0).reshape(-1)
-    weights = weights/(weights.sum()+1e-12)
-    return {"topic_terms":topic_terms, "topic_weights":weights}
+trace_panel()
+job_panel()
 
 
 if not st.session_state.text:
     st.warning("Please upload text on Home."); st.stop()
 
+corpus = get_corpus(st.session_state)
+signature = corpus.signature
+sweep = st.session_state.get("topic_sweep")
+if sweep and sweep.get("signature") != signature:
+    sweep = None
+
+@st.cache_resource
+def get_sweep_pool():
+    """Spawned worker processes shared by every session, started once rather than per click"""
+    return sweep_pool()
+
+def sweep_job(job, tfidf, key, pool):
+    job.progress(0, 1, f"Fitting {len(SWEEP_KS)} topic counts in parallel...")
+    return tfidf and sweep_tfidf(tfidf, key, SWEEP_KS, pool=pool)
+
+def apply_sweep(session_state, result, signature):
+    if result:
+        session_state.topic_sweep = {"signature": signature, **result}
+        session_state.topic_k = result["recommended"]
 
-k = st.slider("Number of topics", 2, 8, 5)
 if st.button("Detect Topics"):
-    topics = topic_model(st.session_state.text, k)
-    if not topics:
-        st.warning("Not enough content.")
-    else:
-        st.session_state.topics = topics
-        labels = [f"Topic {i+1}: " + ", ".join(t[:4]) for i,t in enumerate(topics["topic_terms"])]
-        df = pd.DataFrame({"Topic": labels, "Weight": topics["topic_weights"]})
-        
-        # Display interactive Plotly chart
-        fig = px.pie(df, values="Weight", names="Topic", title="Topic Distribution")
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Save using matplotlib (no Chrome needed!)
-        try:
-            plt.figure(figsize=(10, 6))
-            colors = px.colors.qualitative.Plotly[:len(df)]
-            plt.pie(df["Weight"], labels=df["Topic"], autopct='%1.1f%%', colors=colors)
-            plt.title("Topic Distribution", fontsize=16, fontweight='bold')
-            
-            path = "topic_pie.png"
-            plt.savefig(path, dpi=300, bbox_inches='tight', facecolor='white')
-            plt.close()
-            
-            st.session_state.plots["topic_pie"] = path
-            st.success("✅ Chart saved successfully!")
-        except Exception as e:
-            st.session_state.plots["topic_pie"] = None
-        
-        # Display topics
-        st.subheader("📋 Detected Topics")
-        for i, terms in enumerate(topics["topic_terms"]):
-            st.write(f"• **Topic {i+1}** → {', '.join(terms[:8])}")
+    # TF-IDF comes from the corpus index: only newly added documents were tokenized
+    tfidf = corpus.tfidf(5000)
+    pool = get_sweep_pool()
+    if getattr(pool, "_broken", False):
+        get_sweep_pool.clear()  # a worker died: start a fresh pool
+        pool = get_sweep_pool()
+    # The sweep runs in the background; finished sweeps are reused by key
+    jobs.start(st.session_state, "topics", ("topics", signature, 5000, tuple(SWEEP_KS)), "Detect topics",
+               sweep_job, tfidf, (signature, 5000), pool, on_done=partial(apply_sweep, signature=signature))
+    if jobs.apply_finished(st.session_state) and st.session_state.get("topic_sweep", {}).get("signature") == signature:
+        sweep = st.session_state.topic_sweep
+
+job = job_status("topics")
+if job and job.state == "done" and not job.result and job.key[1] == signature:
+    st.warning("Not enough content.")
+
+if sweep:
+    st.caption(f"💡 Recommended number of topics: **{sweep['recommended']}** (coherence vs. reconstruction error)")
+st.session_state.setdefault("topic_k", 5)
+k = st.slider("Number of topics", min(SWEEP_KS), max(SWEEP_KS), key="topic_k")
+
+if sweep:
+    topics = sweep["results"][k]
+    st.session_state.topics = topics
+    labels = [f"Topic {i+1}: " + ", ".join(t[:4]) for i,t in enumerate(topics["topic_terms"])]
+    df = pd.DataFrame({"Topic": labels, "Weight": topics["topic_weights"]})
+    
+    # Display interactive Plotly chart
+    fig = px.pie(df, values="Weight", names="Topic", title="Topic Distribution")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Matplotlib version for the PDF is only rendered when the report is exported
+    pie = (list(df["Topic"]), [float(w) for w in df["Weight"]])
+    st.session_state.plots["topic_pie"] = Artifact("topic_pie", content_hash(repr(pie)), pie)
+    
+    # Display topics
+    st.subheader("📋 Detected Topics")
+    for i, terms in enumerate(topics["topic_terms"]):
+        st.write(f"• **Topic {i+1}** → {', '.join(terms[:8])}")
+
+    with st.expander("📐 Scores for every topic count"):
+        st.dataframe(pd.DataFrame([
+            {"k": n, "Coherence": r["coherence"], "Reconstruction error": r["reconstruction_err"], "Score": r.get("score")}
+            for n, r in sorted(sweep["results"].items())
+        ]), hide_index=True)
@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from typing import Any
+
+from utils.cache import LRUCache
+from utils.charts import EXPORT_DPI, render_png
+from utils.trace import span
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """Reference to a chart: what to draw (kind + data) and a content key. Stored in st.session_state.plots"""
+    kind: str
+    key: str
+    data: Any
+
+
+class ArtifactStore:
+    """Per-session PNG bytes for charts, rendered lazily per resolution.
+
+    Bytes are keyed by (kind, content key, dpi) in an LRU bounded by entry count and
+    total size, so the high-DPI export render only happens when the PDF asks for it.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 48 * 1024 * 1024):
+        self.images = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    def png(self, artifact: Artifact, dpi: int = None) -> bytes:
+        dpi = dpi or EXPORT_DPI.get(artifact.kind, 200)
+
+        def render():
+            with span("chart.render", "chart", kind=artifact.kind, dpi=dpi) as s:
+                png = render_png(artifact.kind, artifact.data, dpi)
+                s.add(len(png))
+            return png
+
+        return self.images.get_or_create((artifact.kind, artifact.key, dpi), render)
+
+
+def get_store(session_state) -> ArtifactStore:
+    if "artifacts" not in session_state:
+        session_state["artifacts"] = ArtifactStore()
+    return session_state["artifacts"]
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv("DATA_VISTA_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "data-vista"))
+DEFAULT_MAX_BYTES = int(os.getenv("DATA_VISTA_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+def content_hash(*parts) -> str:
+    """sha256 over bytes/str parts, separated so ("ab", "c") != ("a", "bc")"""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+class PageCache:
+    """On-disk cache of per-page extraction results with size-based LRU eviction.
+
+    Keys are content addressed: file bytes hash, page index, render settings
+    and prompt text, so unchanged pages are never sent to the model twice.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        path = path or os.path.join(CACHE_DIR, "pages.sqlite3")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages(accessed)")
+
+    @staticmethod
+    def key(file_hash: str, page_index: int, render: str, prompt: str) -> str:
+        return content_hash(file_hash, str(page_index), render, prompt)
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        found = {}
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self.db.execute(f"SELECT key, text FROM pages WHERE key IN ({marks})", batch).fetchall()
+                found.update(rows)
+                if rows:
+                    self.db.execute(
+                        f"UPDATE pages SET accessed=? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [k for k, _ in rows],
+                    )
+        return found
+
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, text: str):
+        size = len(text.encode("utf-8"))
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages(key, text, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time()),
+            )
+            self._evict()
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM pages")
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used rows until we are back under ~90% of the budget
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale = []
+        for key, size in self.db.execute("SELECT key, size FROM pages ORDER BY accessed"):
+            stale.append(key)
+            freed += size
+            if freed >= excess:
+                break
+        self.db.executemany("DELETE FROM pages WHERE key=?", [(k,) for k in stale])
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU bounded by entry count and, optionally, total size"""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda v: len(v) if isinstance(v, (bytes, bytearray, str)) else 0)
+        self.lock = threading.Lock()
+        self._items = OrderedDict()
+        self._sizes = {}
+        self.bytes = 0
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self._items
+
+    def __len__(self):
+        with self.lock:
+            return len(self._items)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self.lock:
+            if key in self._items:
+                self.bytes -= self._sizes.pop(key)
+                del self._items[key]
+            self._items[key] = value
+            self._sizes[key] = size
+            self.bytes += size
+            while len(self._items) > 1 and (
+                len(self._items) > self.max_entries
+                or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                old, _ = self._items.popitem(last=False)
+                self.bytes -= self._sizes.pop(old)
+        return value
+
+    def get_or_create(self, key, factory):
+        """Return the cached value, building it with factory() outside the lock on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, factory())
+        return value
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key not in self._items:
+                return default
+            self.bytes -= self._sizes.pop(key)
+            return self._items.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.bytes = 0
@@ -0,0 +1,91 @@
+import io
+import threading
+
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+from wordcloud import WordCloud
+
+from utils.cache import LRUCache, content_hash
+from utils.graph import draw_concept_graph
+
+# plotly.express.colors.qualitative.Plotly, so the saved pie matches the on-screen one
+TOPIC_COLORS = ["#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A",
+                "#19D3F3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52"]
+
+
+def keyword_bar_figure(word_freq):
+    """Horizontal bars for [(keyword, count), ...] in most-common order"""
+    rows = sorted(word_freq, key=lambda kv: kv[1])
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    ax.barh([k for k, _ in rows], [c for _, c in rows], color="#74a9ff")
+    ax.set_xlabel("Frequency")
+    ax.set_ylabel("Keyword")
+    ax.set_title(f"Top {len(rows)} Keywords")
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    fig.tight_layout()
+    return fig
+
+
+def topic_pie_figure(pie):
+    labels, weights = pie
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    ax.pie(weights, labels=labels, autopct='%1.1f%%', colors=TOPIC_COLORS[:len(labels)])
+    ax.set_title("Topic Distribution", fontsize=16, fontweight='bold')
+    return fig
+
+
+# Word-cloud layouts by (frequency signature, layout size); layout dominates the cost
+_WORD_CLOUDS = LRUCache(max_entries=16)
+_WORD_CLOUD_LOCK = threading.Lock()  # layouts are shared; `scale` is set per render
+WORD_CLOUD_INCHES = (12, 5)
+
+
+def word_cloud_layout(freqs, width: int, height: int):
+    key = (content_hash(repr(freqs)), width, height)
+
+    def build():
+        wc = WordCloud(width=width, height=height, background_color="white", max_words=len(freqs))
+        return wc.generate_from_frequencies(dict(freqs))
+
+    return _WORD_CLOUDS.get_or_create(key, build)
+
+
+def word_cloud_png(freqs, dpi: int) -> bytes:
+    """Render a 12x5in cloud at `dpi`: small layout for previews, full layout upscaled for export"""
+    layout_w = 600 if dpi <= 100 else 1200
+    wc = word_cloud_layout(freqs, layout_w, layout_w * WORD_CLOUD_INCHES[1] // WORD_CLOUD_INCHES[0])
+    with _WORD_CLOUD_LOCK:
+        wc.scale = WORD_CLOUD_INCHES[0] * dpi / layout_w
+        img = wc.to_image()
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def concept_graph_figure(graph):
+    G, pos = graph
+    return draw_concept_graph(G, pos)
+
+
+RENDERERS = {
+    "keyword_freq": keyword_bar_figure,
+    "topic_pie": topic_pie_figure,
+    "concept_graph": concept_graph_figure,
+}
+
+# Resolution each chart used to be saved at for the PDF
+EXPORT_DPI = {"keyword_freq": 220, "word_cloud": 200, "topic_pie": 300, "concept_graph": 200}
+
+
+def figure_png(fig, dpi: int) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=dpi, facecolor="white")
+    return buf.getvalue()
+
+
+def render_png(kind: str, data, dpi: int) -> bytes:
+    if kind == "word_cloud":
+        return word_cloud_png(data, dpi)
+    return figure_png(RENDERERS[kind](data), dpi)
@@ -0,0 +1,253 @@
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from utils.cache import content_hash
+from utils.graph import graph_from_pairs, pair_counts
+from utils.text import TextPage, analyze, join_text_pages, split_pages
+from utils.topics import MIN_SENTENCE_WORDS
+from utils.trace import span
+
+# Per document, co-occurrence is counted among its most frequent terms only
+PAIR_VOCAB = 500
+
+# Same tokenization as the single-document TfidfVectorizer
+_sentence_terms = CountVectorizer(stop_words="english").build_analyzer()
+
+
+@dataclass
+class CorpusDoc:
+    doc_id: str
+    name: str
+    text: str
+    counts: Counter                 # keyword counts (shared with the text analysis; read-only)
+    words: int
+    rows: sparse.csr_matrix         # sentence x term counts over the corpus vocabulary at add time
+    df: Counter                     # term id -> sentences containing it
+    tf: Counter                     # term id -> occurrences in TF-IDF sentences
+    pairs: dict = field(default_factory=dict)  # window -> {(a, b): n}
+    pages: list = field(default_factory=list)  # TextPage slices for viewing and per-page edits
+
+
+class Corpus:
+    """Many documents analysed as one, updated incrementally.
+
+    Adding a document tokenizes only that document and adds its term counts,
+    co-occurrence pairs and sentence term rows to corpus-wide totals; removing
+    one subtracts them. The TF-IDF vocabulary only grows (ids stay stable), so
+    the matrix for topic modeling is assembled from stored rows without
+    re-reading any text.
+    """
+
+    def __init__(self):
+        self.docs = OrderedDict()
+        self.counts = Counter()
+        self.vocab = {}             # term -> column id (append-only)
+        self.terms = []             # column id -> term
+        self.df = Counter()
+        self.tf = Counter()
+        self.n_sentences = 0
+        self.adjacency = {}         # window -> {a: {b: n}} with a < b
+        self._text = None
+        self._tfidf = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    @property
+    def signature(self) -> str:
+        return content_hash(*self.docs.keys()) if self.docs else ""
+
+    @property
+    def words(self) -> int:
+        return sum(d.words for d in self.docs.values())
+
+    @property
+    def text(self) -> str:
+        """All documents joined, for the stages that still work on one text"""
+        if self._text is None:
+            self._text = "\n\n".join(d.text for d in self.docs.values())
+        return self._text
+
+    def add(self, name: str, text: str) -> str:
+        """Add a document (idempotent per text); returns its id"""
+        analysis = analyze(text)
+        doc_id = analysis.text_hash
+        with self._lock:
+            if doc_id in self.docs:
+                return doc_id
+        with span("corpus.add", "corpus", words=len(analysis.tokens)) as s:
+            s.add(len(text))
+            doc = self._index(doc_id, name, text, analysis)
+            with self._lock:
+                self.docs[doc_id] = doc
+                self.counts.update(doc.counts)
+                self.df.update(doc.df)
+                self.tf.update(doc.tf)
+                self.n_sentences += doc.rows.shape[0]
+                for window, adj in self.adjacency.items():
+                    self._merge_pairs(adj, self._doc_pairs(doc, window), +1)
+                self._changed()
+        return doc_id
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                return
+            for total, part in ((self.counts, doc.counts), (self.df, doc.df), (self.tf, doc.tf)):
+                total.subtract(part)
+                # Counter.subtract keeps zeros; drop them so most_common and vocab selection stay clean
+                for key in part:
+                    if total[key] <= 0:
+                        del total[key]
+            self.n_sentences -= doc.rows.shape[0]
+            for window, adj in self.adjacency.items():
+                self._merge_pairs(adj, doc.pairs.get(window) or {}, -1)
+            self._changed()
+
+    def replace(self, doc_id: str, text: str) -> str:
+        """Swap a document's text (e.g. after an edit); costs one document's worth of work.
+
+        Raises ValueError when the new text is another document already in the corpus.
+        """
+        name = self.docs[doc_id].name if doc_id in self.docs else "Document"
+        new_id = analyze(text).text_hash
+        if new_id == doc_id:
+            return doc_id
+        if new_id in self.docs:
+            raise ValueError(f"the edited text is identical to {self.docs[new_id].name!r}, already in the corpus")
+        with self._lock:
+            order = list(self.docs)
+        self.remove(doc_id)
+        self.add(name, text)
+        if doc_id in order:
+            # Keep the document where it was
+            with self._lock:
+                pos = order.index(doc_id)
+                for later in order[pos + 1:]:
+                    if later in self.docs:
+                        self.docs.move_to_end(later)
+                self._changed()
+        return new_id
+
+    def replace_page(self, doc_id: str, index: int, body: str) -> str:
+        """Edit one page of a document; the other pages' text is reused as is"""
+        pages = list(self.docs[doc_id].pages)
+        old = pages[index]
+        pages[index] = TextPage(old.label, old.header, body)
+        return self.replace(doc_id, join_text_pages(pages))
+
+    def clear(self):
+        self.__init__()
+
+    def _changed(self):
+        self._text = None
+        self._tfidf.clear()
+
+    def _index(self, doc_id, name, text, analysis) -> CorpusDoc:
+        sentences = [Counter(_sentence_terms(s)) for s in analysis.sentence_texts(min_words=MIN_SENTENCE_WORDS)]
+        rows, indptr, df, tf = [], [0], Counter(), Counter()
+        with self._lock:
+            for terms in sentences:
+                row = {}
+                for term, n in terms.items():
+                    col = self.vocab.get(term)
+                    if col is None:
+                        col = self.vocab[term] = len(self.terms)
+                        self.terms.append(term)
+                    row[col] = n
+                rows.append(row)
+                indptr.append(indptr[-1] + len(row))
+                df.update(row.keys())
+                tf.update(row)
+            n_terms = len(self.terms)
+        indices = np.fromiter((c for row in rows for c in row), dtype=np.int32, count=indptr[-1])
+        data = np.fromiter((n for row in rows for n in row.values()), dtype=np.float32, count=indptr[-1])
+        matrix = sparse.csr_matrix((data, indices, np.array(indptr, dtype=np.int64)), shape=(len(rows), n_terms))
+        return CorpusDoc(doc_id, name, text, analysis.counts, len(analysis.tokens), matrix, df, tf,
+                         pages=split_pages(text))
+
+    def _doc_pairs(self, doc: CorpusDoc, window: int) -> dict:
+        if window not in doc.pairs:
+            tokens = analyze(doc.text).tokens
+            doc.pairs[window] = pair_counts(tokens, window=window, vocab_size=PAIR_VOCAB, counts=doc.counts)
+        return doc.pairs[window]
+
+    @staticmethod
+    def _merge_pairs(adj: dict, pairs: dict, sign: int):
+        for (a, b), n in pairs.items():
+            row = adj.setdefault(a, {})
+            total = row.get(b, 0) + sign * n
+            if total > 0:
+                row[b] = total
+            else:
+                row.pop(b, None)
+                if not row:
+                    del adj[a]
+
+    def pairs(self, window: int = 8) -> dict:
+        """Corpus co-occurrence {a: {b: n}}; a new window is computed once per document, then kept up to date"""
+        with self._lock:
+            adj = self.adjacency.get(window)
+            if adj is None:
+                adj = {}
+                for doc in self.docs.values():
+                    self._merge_pairs(adj, self._doc_pairs(doc, window), +1)
+                self.adjacency[window] = adj
+            return adj
+
+    def concept_graph(self, topics=None, window: int = 8, top_nodes: int = 25, max_edges: int = 60):
+        return graph_from_pairs(self.counts, self.pairs(window), topics, top_nodes=top_nodes, max_edges=max_edges)
+
+    def tfidf(self, max_features: int = 5000):
+        """(X, feature_names) like tfidf_matrix, assembled from stored sentence rows, or None"""
+        with self._lock:
+            if max_features in self._tfidf:
+                return self._tfidf[max_features]
+            n_terms = len(self.terms)
+            result = None
+            if self.n_sentences >= 3 and self.tf:
+                with span("corpus.tfidf", "corpus", sentences=self.n_sentences):
+                    # max_features keeps the most frequent terms, as TfidfVectorizer does
+                    top = sorted(self.tf.most_common(max_features), key=lambda kv: self.terms[kv[0]])
+                    cols = np.array([c for c, _ in top], dtype=np.int64)
+                    blocks = []
+                    for doc in self.docs.values():
+                        rows = doc.rows
+                        if rows.shape[1] < n_terms:
+                            rows = sparse.csr_matrix((rows.data, rows.indices, rows.indptr), shape=(rows.shape[0], n_terms))
+                        blocks.append(rows)
+                    X = sparse.vstack(blocks, format="csr")[:, cols]
+                    df = np.array([self.df[c] for c in cols], dtype=np.float32)
+                    idf = np.log((1 + self.n_sentences) / (1 + df)) + 1
+                    X = normalize(X @ sparse.diags(idf.astype(np.float32)), norm="l2").astype(np.float32).tocsr()
+                    if X.shape[0] >= 2 and X.shape[1] >= 2:
+                        result = (X, np.array([self.terms[c] for c in cols], dtype=object))
+            self._tfidf[max_features] = result
+            return result
+
+    def documents(self):
+        return [(d.doc_id, d.name, d.words) for d in self.docs.values()]
+
+    def get(self, doc_id):
+        return self.docs.get(doc_id)
+
+
+def get_corpus(session_state) -> Corpus:
+    """The session's corpus; text set directly on st.session_state.text becomes its single document"""
+    if "corpus" not in session_state:
+        session_state["corpus"] = Corpus()
+    corpus = session_state["corpus"]
+    if not len(corpus) and session_state.get("text"):
+        corpus.add("Document", session_state["text"])
+    return corpus
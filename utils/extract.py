@@ -0,0 +1,121 @@
+import io
+
+from PIL import Image
+
+from utils.cache import PageCache, content_hash
+from utils.gemini import (DEFAULT_CONCURRENCY, DEFAULT_PAGES_PER_REQUEST, DEFAULT_RPM, PAGE_PROMPT,
+                          generate_with_retry, ocr_pages)
+from utils.pdf import PdfDocument, RenderSettings
+
+IMAGE_PROMPT = (
+    "Extract ALL text from this image. If it contains handwritten notes, transcribe them accurately. "
+    "Preserve the structure and formatting. Return only the extracted text without any additional commentary."
+)
+DOCX_PROMPT = (
+    "Extract ALL text content from this DOCX document. "
+    "Preserve headings, paragraphs, and structure. "
+    "Return only the extracted text."
+)
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+SUPPORTED_SUFFIXES = (".pdf", ".docx", ".txt", ".png", ".jpg", ".jpeg")
+
+
+def decode_text(raw: bytes) -> str:
+    for enc in ("utf-8", "utf-16", "latin-1"):
+        try:
+            return raw.decode(enc)
+        except Exception:
+            continue
+    return ""
+
+
+def extract_image(model, img, limiter=None) -> str:
+    return generate_with_retry(model, [IMAGE_PROMPT, img], limiter=limiter).text
+
+
+def extract_docx(model, data: bytes, files=None, limiter=None) -> str:
+    """Through the model's file API when `files` (e.g. the genai module) is given, else read locally"""
+    if files is None:
+        import docx
+        return "\n".join(p.text for p in docx.Document(io.BytesIO(data)).paragraphs)
+    uploaded = files.upload_file(io.BytesIO(data), mime_type=DOCX_MIME)
+    try:
+        return generate_with_retry(model, [DOCX_PROMPT, uploaded], limiter=limiter).text
+    finally:
+        files.delete_file(uploaded.name)
+
+
+def plan_pdf_pages(doc, start: int, end: int, use_text_layer: bool = True,
+                   render: RenderSettings = RenderSettings(), cache: PageCache = None):
+    """Resolve what it can locally for pages start..end.
+
+    Returns (texts, keys, missing, local): texts per page from the text layer and the page
+    cache, cache keys of the pages needing OCR, the pages still missing, and how many
+    pages came from the text layer.
+    """
+    texts = {}
+    if use_text_layer:
+        try:
+            texts = {n: t for n, t in doc.text_layers(start, end).items() if t}
+        except Exception:
+            texts = {}
+    local = len(texts)
+    # Only pages never seen with this file, render settings and prompt go to Gemini
+    keys = {n: PageCache.key(doc.hash, n, render.signature, PAGE_PROMPT)
+            for n in range(start, end + 1) if n not in texts}
+    if cache and keys:
+        hits = cache.get_many(keys.values())
+        texts.update({n: hits[k] for n, k in keys.items() if k in hits})
+    return texts, keys, set(keys) - set(texts), local
+
+
+def ocr_pdf_pages(model, doc, missing, keys, texts, render: RenderSettings = RenderSettings(), cache: PageCache = None,
+                  on_page=None, rpm: float = DEFAULT_RPM, max_workers: int = DEFAULT_CONCURRENCY, limiter=None,
+                  pages_per_request: int = DEFAULT_PAGES_PER_REQUEST):
+    """OCR the missing pages into `texts` (and the cache); returns the bytes of each page image sent"""
+    sent_bytes = []
+
+    def payloads():
+        # Pages are rendered, compacted and sent one at a time as workers free up
+        for page_num, blob in doc.payloads(missing, render):
+            sent_bytes.append(len(blob["data"]))
+            yield page_num, blob
+
+    def store(page_num, text):
+        texts[page_num] = text
+        if cache:
+            cache.put(keys[page_num], text)
+        if on_page:
+            on_page(page_num, text)
+
+    ocr_pages(model, payloads(), prompt=PAGE_PROMPT, rpm=rpm, max_workers=max_workers,
+              on_page=store, limiter=limiter, pages_per_request=pages_per_request)
+    return sent_bytes
+
+
+def join_pages(texts: dict) -> str:
+    return "\n".join(f"\n--- Page {n} ---\n{texts[n]}" for n in sorted(texts))
+
+
+def extract_document(name: str, data: bytes, model, files=None, start_page=None, end_page=None,
+                     use_text_layer=True, render=RenderSettings(), cache=None, doc=None,
+                     rpm=DEFAULT_RPM, max_workers=DEFAULT_CONCURRENCY, limiter=None,
+                     pages_per_request=DEFAULT_PAGES_PER_REQUEST) -> str:
+    """Text of one document with no UI: the same routing as the Home page, errors are raised"""
+    name = name.lower()
+    if name.endswith((".png", ".jpg", ".jpeg")):
+        return extract_image(model, Image.open(io.BytesIO(data)), limiter=limiter)
+    if name.endswith(".pdf"):
+        doc = doc or PdfDocument(data, content_hash(data))
+        start, end = start_page or 1, end_page or doc.page_count
+        texts, keys, missing, _ = plan_pdf_pages(doc, start, end, use_text_layer, render, cache)
+        if missing:
+            ocr_pdf_pages(model, doc, missing, keys, texts, render, cache,
+                          rpm=rpm, max_workers=max_workers, limiter=limiter, pages_per_request=pages_per_request)
+        return join_pages(texts)
+    if name.endswith(".docx"):
+        return extract_docx(model, data, files=files, limiter=limiter)
+    if name.endswith(".txt"):
+        return decode_text(data)
+    raise ValueError(f"Unsupported file type: {name}")
@@ -0,0 +1,242 @@
+import contextvars
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from utils.trace import span
+
+PAGE_PROMPT = (
+    "Extract ALL text from this PDF page (page {page_num}). "
+    "Preserve structure, headings, and formatting. "
+    "If there are tables, preserve their structure. "
+    "Return only the extracted text."
+)
+
+# Several pages per request: one prompt, each image labelled, answers delimited per page
+BATCH_PROMPT = (
+    "Extract ALL text from each of the {count} PDF page images below (pages {pages}). "
+    "Preserve structure, headings, and formatting. "
+    "If there are tables, preserve their structure. "
+    "Before the text of each page write a line containing only <<<PAGE n>>>, where n is the page number given "
+    "before its image, and after the last page write a line containing only <<<END>>>. "
+    "Return only the markers and the extracted text."
+)
+PAGE_MARKER_RE = re.compile(r"^[ \t]*<<<PAGE (\d+)>>>[ \t]*$", re.M)
+END_MARKER_RE = re.compile(r"^[ \t]*<<<END>>>[ \t]*$", re.M)
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# Free tier for gemini-2.0-flash allows 15 requests per minute
+DEFAULT_RPM = int(os.getenv("GEMINI_RPM", "15"))
+DEFAULT_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+# Requests per minute, not tokens, is the binding limit on the free tier
+DEFAULT_PAGES_PER_REQUEST = int(os.getenv("GEMINI_PAGES_PER_REQUEST", "4"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting requests per minute"""
+
+    def __init__(self, rpm: float, burst: int = None):
+        self.rate = max(rpm, 1e-6) / 60.0
+        self.capacity = float(burst if burst is not None else max(1, min(int(rpm), 4)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def status_code(exc) -> int:
+    """Best-effort HTTP status of an API error (google.api_core, requests, or plain messages)"""
+    for attr in ("code", "status_code", "status"):
+        val = getattr(exc, attr, None)
+        if callable(val):
+            try:
+                val = val()
+            except Exception:
+                val = None
+        if isinstance(val, int):
+            return val
+    resp = getattr(exc, "response", None)
+    if isinstance(getattr(resp, "status_code", None), int):
+        return resp.status_code
+    msg = str(exc)
+    for code in RETRYABLE_STATUS:
+        if msg.startswith(str(code)) or f" {code} " in f" {msg} ":
+            return code
+    return 0
+
+
+def generate_with_retry(model, contents, limiter: TokenBucket = None, retries: int = 4,
+                        base_delay: float = 2.0, max_delay: float = 30.0):
+    """Call model.generate_content, retrying 429/5xx with jittered exponential backoff"""
+    sent = sum(len(c["data"]) for c in contents if isinstance(c, dict) and "data" in c)
+    with span("gemini.call", "gemini") as s:
+        s.add(sent)
+        for attempt in range(retries + 1):
+            if limiter:
+                limiter.acquire()
+            try:
+                response = model.generate_content(contents)
+                s.add(attempts=attempt + 1, chars=len(getattr(response, "text", "") or ""))
+                return response
+            except Exception as e:
+                if attempt == retries or status_code(e) not in RETRYABLE_STATUS:
+                    s.add(attempts=attempt + 1)
+                    raise
+                delay = min(max_delay, base_delay * 2 ** attempt)
+                time.sleep(delay * (0.5 + random.random() / 2))
+
+
+def batch_contents(batch, prompt: str = BATCH_PROMPT) -> list:
+    """One request for [(page_num, image), ...]: the batch prompt, then each image after its page label"""
+    contents = [prompt.format(count=len(batch), pages=", ".join(str(n) for n, _ in batch))]
+    for page_num, img in batch:
+        contents += [f"Page {page_num}:", img]
+    return contents
+
+
+def split_batch(text: str, page_nums) -> dict:
+    """{page_num: text} from a batched answer, or None unless every page is marked once, in order, before <<<END>>>"""
+    end = END_MARKER_RE.search(text or "")
+    if end is None:
+        return None  # likely truncated at the output token limit
+    text = text[:end.start()]
+    marks = list(PAGE_MARKER_RE.finditer(text))
+    if not marks or [int(m.group(1)) for m in marks] != list(page_nums):
+        return None
+    head = text[:marks[0].start()].strip()
+    if head not in ("", "```", "```text"):
+        return None  # commentary before the first page: the format was not followed
+    bounds = [m.end() for m in marks], [m.start() for m in marks[1:]] + [len(text)]
+    texts = {n: text[start:stop].strip("\n") for n, start, stop in zip(page_nums, *bounds)}
+    if head:
+        # Answer wrapped in a code fence: drop the closing one
+        last = page_nums[-1]
+        texts[last] = texts[last].rstrip().removesuffix("```").rstrip("\n")
+    return texts
+
+
+def ocr_pages(model, pages, prompt: str = PAGE_PROMPT, rpm: float = DEFAULT_RPM,
+              max_workers: int = DEFAULT_CONCURRENCY, on_page=None, limiter: TokenBucket = None,
+              pages_per_request: int = DEFAULT_PAGES_PER_REQUEST, batch_prompt: str = BATCH_PROMPT):
+    """OCR (page_num, image) pairs concurrently and return the texts in page order.
+
+    `pages` may be a lazy iterable; at most `2 * max_workers` requests' images are held at once.
+    With `pages_per_request` > 1 pages are sent in batches and the answer is split at
+    per-page markers; a batch whose answer does not validate, or that fails with a
+    non-retryable error, is redone one page per request.
+    `on_page(page_num, text)` is called from the calling thread as pages complete,
+    so it is safe to update Streamlit widgets from it.
+    """
+    limiter = limiter or TokenBucket(rpm)
+    results = {}
+
+    def single(page_num, img):
+        response = generate_with_retry(model, [prompt.format(page_num=page_num), img], limiter)
+        return response.text
+
+    def work(batch):
+        if len(batch) == 1:
+            return {batch[0][0]: single(*batch[0])}
+        with span("gemini.batch", "gemini", pages=len(batch)) as s:
+            try:
+                response = generate_with_retry(model, batch_contents(batch, batch_prompt), limiter)
+                texts = split_batch(getattr(response, "text", ""), [n for n, _ in batch])
+            except Exception as e:
+                # e.g. 400 for an oversized payload or a safety block; rate limits stay errors
+                if status_code(e) in RETRYABLE_STATUS:
+                    raise
+                s.add(error=type(e).__name__)
+                texts = None
+            if texts is None:
+                s.add(fallback=True)
+                texts = {n: single(n, img) for n, img in batch}
+            return texts
+
+    def batches():
+        batch = []
+        for item in pages:
+            batch.append(item)
+            if len(batch) >= max(1, pages_per_request):
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+
+        def drain(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for fut in done:
+                pending.pop(fut)
+                texts = fut.result()
+                for page_num in sorted(texts):
+                    results[page_num] = texts[page_num]
+                    if on_page:
+                        on_page(page_num, texts[page_num])
+
+        try:
+            for batch in batches():
+                if len(pending) >= 2 * max_workers:
+                    drain(FIRST_COMPLETED)
+                # Each request runs in a copy of this context so its spans reach the caller's tracer
+                pending[pool.submit(contextvars.copy_context().run, work, batch)] = batch
+            while pending:
+                drain(FIRST_COMPLETED)
+        except BaseException:
+            for fut in pending:
+                fut.cancel()
+            raise
+
+    return [results[n] for n in sorted(results)]
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    """Offline stand-in for genai.GenerativeModel, for benchmarks and local runs"""
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents):
+        with self.lock:
+            self.calls += 1
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            fail = self.rng.random() < self.fail_rate
+        time.sleep(delay)
+        if fail:
+            err = RuntimeError("429 Resource has been exhausted (stub)")
+            err.code = 429
+            raise err
+        prompt = next((c for c in contents if isinstance(c, str)), "")
+        if "<<<PAGE" in prompt:
+            labels = [c for c in contents[1:] if isinstance(c, str)]
+            pages = [f"<<<PAGE {label[5:-1]}>>>\n[stub] {label}" for label in labels]
+            return StubResponse("\n".join(pages + ["<<<END>>>"]))
+        return StubResponse(f"[stub] {prompt[:60]}")
@@ -0,0 +1,191 @@
+import heapq
+from collections import Counter
+
+import networkx as nx
+import numpy as np
+from matplotlib.figure import Figure
+from scipy import sparse
+
+from utils.cache import LRUCache, content_hash
+from utils.trace import span
+
+NODE_BUDGET = 90
+EDGE_BUDGET = 260
+
+
+def encode_tokens(tokens, vocab_size: int = 500, counts: Counter = None):
+    """Integer-encode tokens over the `vocab_size` most frequent terms.
+
+    Returns (ids, vocab): ids[i] is the vocab index of tokens[i], or -1 when the
+    term is outside the vocabulary. Vocab is ordered by descending frequency.
+    """
+    counts = counts if counts is not None else Counter(tokens)
+    vocab = [w for w, _ in counts.most_common(vocab_size)]
+    index = {w: i for i, w in enumerate(vocab)}
+    ids = np.fromiter((index.get(t, -1) for t in tokens), dtype=np.int32, count=len(tokens))
+    return ids, vocab
+
+
+def cooccurrence_matrix(tokens, window: int = 8, vocab_size: int = 500, counts: Counter = None):
+    """Symmetric term co-occurrence counts within `window` consecutive tokens.
+
+    Out-of-vocabulary tokens keep their position, so distances are measured in
+    the original token stream. Returns (csr upper-triangular matrix, vocab).
+    """
+    ids, vocab = encode_tokens(tokens, vocab_size, counts)
+    rows, cols = [], []
+    for d in range(1, max(2, window)):
+        a, b = ids[:-d], ids[d:]
+        keep = (a >= 0) & (b >= 0) & (a != b)
+        a, b = a[keep], b[keep]
+        rows.append(np.minimum(a, b))
+        cols.append(np.maximum(a, b))
+    r = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+    c = np.concatenate(cols) if cols else np.empty(0, dtype=np.int32)
+    n = len(vocab)
+    M = sparse.coo_matrix((np.ones(len(r), dtype=np.int32), (r, c)), shape=(n, n)).tocsr()  # sums duplicates
+    return M, vocab
+
+
+def top_edges(M, k: int):
+    """The k heaviest (row, col, weight) entries of a sparse matrix"""
+    M = M.tocoo()
+    if M.nnz == 0 or k <= 0:
+        return []
+    order = np.argsort(M.data)[::-1][:k]
+    return [(int(M.row[i]), int(M.col[i]), int(M.data[i])) for i in order]
+
+
+def pair_counts(tokens, window: int = 8, vocab_size: int = 500, counts: Counter = None) -> dict:
+    """{(a, b): n} co-occurrence counts (a < b) among the `vocab_size` most frequent terms; additive across documents"""
+    M, vocab = cooccurrence_matrix(tokens, window=window, vocab_size=vocab_size, counts=counts)
+    M = M.tocoo()
+    out = {}
+    for i, j, n in zip(M.row.tolist(), M.col.tolist(), M.data.tolist()):
+        a, b = vocab[i], vocab[j]
+        out[(a, b) if a < b else (b, a)] = n
+    return out
+
+
+def build_concept_graph(keywords, topics, window: int = 8, top_nodes: int = 25, max_edges: int = 60,
+                        counts: Counter = None):
+    """Keyword co-occurrence graph over the top terms, plus topic hubs when topics exist"""
+    G = nx.Graph()
+    M, vocab = cooccurrence_matrix(keywords, window=window, vocab_size=top_nodes, counts=counts)
+    counts = counts if counts is not None else Counter(keywords)
+    for w in vocab:
+        G.add_node(w, size=10 + counts[w], type="keyword")
+    for u, v, weight in top_edges(M, max_edges):
+        G.add_edge(vocab[u], vocab[v], weight=weight)
+    add_topic_hubs(G, topics)
+    return G
+
+
+def graph_from_pairs(counts: Counter, adjacency: dict, topics, top_nodes: int = 25, max_edges: int = 60):
+    """build_concept_graph from precomputed counts and {a: {b: n}} pair counts (a < b), e.g. a corpus"""
+    G = nx.Graph()
+    vocab = [w for w, _ in counts.most_common(top_nodes)]
+    nodes = set(vocab)
+    for w in vocab:
+        G.add_node(w, size=10 + counts[w], type="keyword")
+    edges = ((n, a, b) for a in vocab for b, n in adjacency.get(a, {}).items() if b in nodes)
+    for weight, u, v in heapq.nlargest(max_edges, edges):
+        G.add_edge(u, v, weight=weight)
+    add_topic_hubs(G, topics)
+    return G
+
+
+def add_topic_hubs(G, topics):
+    if topics:
+        for t_idx, terms in enumerate(topics["topic_terms"]):
+            hub = f"Topic {t_idx+1}"
+            w = float(topics["topic_weights"][t_idx]); G.add_node(hub, size=20 + int(100 * w), type="topic")
+            for term in terms[:5]:
+                if term not in G: G.add_node(term, size=12, type="term")
+                G.add_edge(hub, term, weight=2)
+    return G
+
+
+def topics_signature(topics) -> str:
+    if not topics:
+        return ""
+    return content_hash(repr([list(t) for t in topics["topic_terms"]]), repr([round(float(w), 6) for w in topics["topic_weights"]]))
+
+
+def graph_signature(G) -> str:
+    nodes = sorted((str(n), G.nodes[n].get("type", ""), G.nodes[n].get("size", 0)) for n in G.nodes)
+    edges = sorted((*sorted((str(u), str(v))), d.get("weight", 1)) for u, v, d in G.edges(data=True))
+    return content_hash(repr(nodes), repr(edges))
+
+
+def prune_graph(G, max_nodes: int = NODE_BUDGET, max_edges: int = EDGE_BUDGET):
+    """Keep layout and drawing bounded: topic hubs first, then the largest nodes and heaviest edges"""
+    if G.number_of_nodes() <= max_nodes and G.number_of_edges() <= max_edges:
+        return G
+    rank = sorted(G.nodes, key=lambda n: (G.nodes[n].get("type") != "topic", -G.nodes[n].get("size", 10)))
+    H = G.subgraph(rank[:max_nodes]).copy()
+    if H.number_of_edges() > max_edges:
+        def edge_rank(e):
+            u, v, d = e
+            hub = "topic" in (H.nodes[u].get("type"), H.nodes[v].get("type"))
+            return (hub, d.get("weight", 1))
+        edges = sorted(H.edges(data=True), key=edge_rank, reverse=True)
+        H.remove_edges_from([(u, v) for u, v, _ in edges[max_edges:]])
+    return H
+
+
+# Layouts by exact graph signature, plus the keyword-only layout each was grown from
+_LAYOUTS = LRUCache(max_entries=64)
+
+
+def layout_graph(G, k: float = 0.35, iterations: int = 50, seed: int = 42):
+    """spring_layout cached per graph signature.
+
+    Adding topic hubs to an already laid-out keyword graph warm-starts from the
+    previous positions: known keywords stay fixed and only new nodes move.
+    """
+    sig = graph_signature(G)
+    pos = _LAYOUTS.get(sig)
+    if pos is not None:
+        return pos
+    keyword_nodes = [n for n in G if G.nodes[n].get("type", "keyword") == "keyword"]
+    base_key = ("base", graph_signature(G.subgraph(keyword_nodes)))
+    base = _LAYOUTS.get(base_key)
+    with span("graph.layout", "graph", nodes=G.number_of_nodes(), edges=G.number_of_edges(),
+              warm=bool(base and len(base) < len(G))):
+        pos = _spring_layout(G, base, k, iterations, seed)
+    if base is None:
+        _LAYOUTS.put(base_key, {n: pos[n] for n in keyword_nodes})
+    return _LAYOUTS.put(sig, pos)
+
+
+def _spring_layout(G, base, k, iterations, seed):
+    if base and len(base) < len(G):
+        rng = np.random.default_rng(seed)
+        init = dict(base)
+        for n in G:
+            if n not in init:
+                anchors = [init[m] for m in G.neighbors(n) if m in init]
+                centre = np.mean(anchors, axis=0) if anchors else np.zeros(2)
+                init[n] = centre + rng.normal(scale=0.05, size=2)
+        return nx.spring_layout(G, pos=init, fixed=list(base), k=k, iterations=max(10, iterations // 3), seed=seed)
+    return nx.spring_layout(G, k=k, iterations=iterations, seed=seed)
+
+
+def draw_concept_graph(G, pos, figsize=(10, 6)):
+    """Matplotlib figure of the concept graph (no pyplot global state, safe across sessions)"""
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    sizes = [G.nodes[n].get("size", 10) * 30 for n in G.nodes]
+    colors = []
+    for n in G.nodes:
+        t = G.nodes[n].get("type", "keyword")
+        colors.append("#ff7f0e" if t == "topic" else "#1f77b4" if t == "term" else "#2ca02c")
+    nx.draw_networkx_nodes(G, pos, ax=ax, node_size=sizes, node_color=colors, alpha=0.85, linewidths=0.5, edgecolors="#333")
+    max_w = max([G[u][v]["weight"] for u, v in G.edges], default=1)
+    widths = [0.5 + 4 * G[u][v]["weight"] / max_w for u, v in G.edges]
+    nx.draw_networkx_edges(G, pos, ax=ax, width=widths, alpha=0.3, edge_color="#555")
+    labels = {n: n for n in G.nodes if G.nodes[n].get("size", 10) >= 18 or G.nodes[n].get("type") == "topic"}
+    nx.draw_networkx_labels(G, pos, ax=ax, labels=labels, font_size=9)
+    ax.axis("off")
+    return fig
@@ -0,0 +1,68 @@
+import streamlit as st
+
+from utils.jobs import FAILED, apply_finished, cancel, current, watched
+
+POLL_SECONDS = 1.0
+
+# st.fragment graduated from experimental in 1.37
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+ICONS = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌", "cancelled": "⏹️"}
+
+
+def _describe(job) -> str:
+    text = f"{ICONS[job.state]} **{job.label}** · {job.state}"
+    if job.total:
+        text += f" · {job.done}/{job.total}"
+    if job.started:
+        text += f" · {job.seconds:.0f}s"
+    return text
+
+
+def _jobs_list(running_keys=()):
+    rows = watched(st.session_state)
+    if any(job.key in running_keys and job.finished for _, job in rows):
+        st.rerun()  # a job finished: rerun the page so its result is applied
+    for _, job in rows:
+        st.caption(_describe(job))
+
+
+_jobs_list_live = _fragment(run_every=POLL_SECONDS)(_jobs_list)
+
+
+def job_panel():
+    """Apply finished background jobs to this session and list them in the sidebar"""
+    apply_finished(st.session_state)
+    rows = watched(st.session_state)
+    if not rows:
+        return
+    with st.sidebar.expander("🧵 Background jobs", expanded=any(not job.finished for _, job in rows)):
+        running = tuple(job.key for _, job in rows if not job.finished)
+        (_jobs_list_live if running else _jobs_list)(running)
+
+
+def _progress(slot):
+    job = current(st.session_state, slot)
+    if job is None or job.finished:
+        st.rerun()
+    text = f"{job.label}: {job.message or job.state}"
+    st.progress(job.fraction, text=text)
+    if st.button("Cancel", key=f"cancel_job_{slot}"):
+        cancel(st.session_state, slot)
+        st.rerun()
+
+
+_progress_live = _fragment(run_every=POLL_SECONDS)(_progress)
+
+
+def job_status(slot):
+    """Show the session's `slot` job: live progress while it runs, its error if it failed. Returns the job."""
+    job = current(st.session_state, slot)
+    if job is None:
+        return None
+    if not job.finished:
+        _progress_live(slot)
+    elif job.state == FAILED:
+        st.error(f"❌ {job.label} failed: {job.error}")
+    return job
+
@@ -0,0 +1,196 @@
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.trace import span
+
+JOB_WORKERS = int(os.getenv("DATA_VISTA_JOB_WORKERS", "2"))
+KEEP_FINISHED = 32
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """One background task; `fn(job, ...)` reports progress through it and may be cancelled between steps"""
+
+    def __init__(self, key, label):
+        self.key, self.label = key, label
+        self.state = QUEUED
+        self.done, self.total, self.message = 0, 0, ""
+        self.result = self.error = None
+        self.submitted, self.started, self.finished_at = time.time(), None, None
+        self.subscribers = set()    # sessions watching this job; it is shared by key
+        self._cancel = threading.Event()
+
+    def progress(self, done: int, total: int = None, message: str = None):
+        """Record progress; raises JobCancelled once a cancel was requested"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+
+    def cancel(self):
+        self._cancel.set()
+
+    def release(self, owner) -> bool:
+        """Stop watching; the job is cancelled only when its last subscriber lets go"""
+        self.subscribers.discard(owner)
+        if not self.subscribers and not self.finished:
+            self.cancel()
+            return True
+        return False
+
+    @property
+    def fraction(self) -> float:
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    @property
+    def seconds(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started
+
+
+class JobQueue:
+    """Thread pool running jobs by key: submitting a key that is queued, running or done returns that job.
+
+    Threads rather than processes: the Gemini client, loaded summarizer and page
+    cache are shared in-process objects, and the heavy work (network calls,
+    torch, NMF) releases the GIL.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, keep: int = KEEP_FINISHED):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="data-vista-job")
+        self.keep = keep
+        self.lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, key, label, fn, *args, owner=None, **kwargs) -> Job:
+        with self.lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state not in (FAILED, CANCELLED) and not job._cancel.is_set():
+                self._jobs.move_to_end(key)
+                job.subscribers.add(owner)
+                return job
+            job = self._jobs[key] = Job(key, label)
+            job.subscribers.add(owner)
+            self._evict()
+        # Spans from the job land in the submitting session's tracer
+        self.pool.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.started = time.time()
+        job.state = RUNNING
+        try:
+            with span("job", "jobs", label=job.label):
+                if job._cancel.is_set():
+                    raise JobCancelled()
+                job.result = fn(job, *args, **kwargs)
+            job.state = DONE
+        except JobCancelled:
+            job.state = CANCELLED
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.state = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def release(self, key, owner) -> bool:
+        """`owner` no longer wants the job; under the lock so a concurrent submit cannot rejoin a cancelled job"""
+        with self.lock:
+            job = self._jobs.get(key)
+            return job is not None and job.release(owner)
+
+    def get(self, key):
+        with self.lock:
+            return self._jobs.get(key)
+
+    def jobs(self):
+        with self.lock:
+            return list(self._jobs.values())
+
+    def _evict(self):
+        # Only finished jobs are dropped; their results are the cache
+        finished = [k for k, j in self._jobs.items() if j.finished]
+        for key in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[key]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    """Process-wide queue, shared by every session and page"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def start(session_state, slot, key, label, fn, *args, on_done=None, **kwargs) -> Job:
+    """Run `fn(job, *args, **kwargs)` in the background as this session's `slot` job.
+
+    `on_done(session_state, result)` is applied once, on the first rerun after it finishes.
+    """
+    owner = session_state.setdefault("job_owner", uuid.uuid4().hex)
+    entry = session_state.setdefault("jobs", {}).get(slot)
+    if entry and entry["key"] != key:
+        cancel(session_state, slot)  # the slot's previous job is no longer wanted by this session
+    job = get_queue().submit(key, label, fn, *args, owner=owner, **kwargs)
+    session_state.setdefault("jobs", {})[slot] = {"key": key, "on_done": on_done, "applied": False}
+    return job
+
+
+def cancel(session_state, slot):
+    """Detach this session from its `slot` job; the work stops only if no other session still wants it"""
+    entry = session_state.get("jobs", {}).pop(slot, None)
+    if entry:
+        get_queue().release(entry["key"], session_state.get("job_owner"))
+
+
+def current(session_state, slot):
+    entry = session_state.get("jobs", {}).get(slot)
+    return entry and get_queue().get(entry["key"])
+
+
+def watched(session_state):
+    """(slot, job) for this session's jobs still held by the queue"""
+    out = []
+    for slot, entry in list(session_state.get("jobs", {}).items()):
+        job = get_queue().get(entry["key"])
+        if job is None:
+            del session_state["jobs"][slot]
+        else:
+            out.append((slot, job))
+    return out
+
+
+def apply_finished(session_state):
+    """Hand finished results to the session; returns the jobs applied"""
+    applied = []
+    for slot, job in watched(session_state):
+        entry = session_state["jobs"][slot]
+        if job.state == DONE and not entry["applied"]:
+            entry["applied"] = True
+            if entry["on_done"]:
+                entry["on_done"](session_state, job.result)
+            applied.append(job)
+    return applied
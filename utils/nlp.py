@@ -0,0 +1,28 @@
+from utils.text import chunk_text
+from utils.trace import span
+
+NER_EXCLUDE = ["parser", "tagger", "attribute_ruler", "lemmatizer", "senter"]
+
+
+def load_ner(model_name: str = "en_core_web_sm"):
+    """spaCy pipeline trimmed to named-entity recognition"""
+    import spacy  # lazily, so chunk_text users do not need spaCy
+    nlp = spacy.load(model_name, exclude=NER_EXCLUDE)
+    # tok2vec only matters if something still listens to it (ner has its own in the sm/md models)
+    if "tok2vec" in nlp.pipe_names and not getattr(nlp.get_pipe("tok2vec"), "listening_components", None):
+        nlp.remove_pipe("tok2vec")
+    return nlp
+
+
+def extract_entities(nlp, text: str, chunk_chars: int = 50_000, batch_size: int = 8, n_process: int = 1):
+    """Entities as (text, label, start, end) with offsets into `text`, in document order"""
+    chunk_chars = min(chunk_chars, nlp.max_length)
+    chunks = chunk_text(text, chunk_chars)
+    with span("nlp.ner", "nlp", chunks=len(chunks)) as s:
+        s.add(len(text))
+        docs = nlp.pipe((c for _, c in chunks), batch_size=batch_size, n_process=n_process)
+        ents = []
+        for (offset, _), doc in zip(chunks, docs):
+            ents.extend((e.text, e.label_, offset + e.start_char, offset + e.end_char) for e in doc.ents)
+        s.add(entities=len(ents))
+    return ents
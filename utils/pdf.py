@@ -0,0 +1,183 @@
+import io
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pdfplumber
+
+from utils.trace import span
+
+MIN_TEXT_CHARS = 40
+MIN_WORD_RATIO = 0.6
+
+WORDISH_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'’.,:;()\-]*")
+
+
+def text_layer_quality(text: str) -> float:
+    """Share of whitespace-separated tokens that look like real words (0..1)"""
+    tokens = text.split()
+    if not tokens:
+        return 0.0
+    # "(cid:123)" runs and replacement chars mean the font has no usable ToUnicode map
+    if text.count("(cid:") > 3 or text.count("�") > 3:
+        return 0.0
+    good = sum(1 for t in tokens if WORDISH_RE.fullmatch(t))
+    return good / len(tokens)
+
+
+def format_table(rows) -> str:
+    return "\n".join(" | ".join((cell or "").replace("\n", " ").strip() for cell in row) for row in rows if row)
+
+
+def page_text_layer(page, min_chars: int = MIN_TEXT_CHARS, min_quality: float = MIN_WORD_RATIO):
+    """Text of a born-digital page (tables kept as pipe-separated rows), or None if it needs OCR"""
+    try:
+        tables = page.find_tables()
+        body = page
+        for table in tables:
+            body = body.outside_bbox(table.bbox)
+        text = (body.extract_text() or "").strip()
+        table_text = [format_table(t.extract()) for t in tables]
+    except Exception:
+        return None
+    full = "\n\n".join([text] + [t for t in table_text if t]).strip()
+    if len(full) < min_chars or text_layer_quality(full) < min_quality:
+        return None
+    return full
+
+
+def extract_text_layers(pdf_file, start_page: int, end_page: int) -> dict:
+    """Map 1-indexed page number -> local text, or None for pages that need vision OCR"""
+    pdf_file.seek(0)
+    layers = {}
+    with pdfplumber.open(pdf_file) as pdf:
+        end = min(len(pdf.pages), end_page)
+        for page_num in range(max(1, start_page), end + 1):
+            page = pdf.pages[page_num - 1]
+            layers[page_num] = page_text_layer(page)
+            page.flush_cache()
+    return layers
+
+
+@dataclass(frozen=True)
+class RenderSettings:
+    """How PDF pages are rasterized and re-encoded before upload"""
+    dpi: int = 150
+    max_side: int = 2000          # adaptive DPI: cap the longest side in pixels
+    grayscale: bool = False
+    fmt: str = "JPEG"             # JPEG or WEBP
+    quality: int = 85
+    max_bytes: int = 600_000      # per-page upload budget
+
+    @property
+    def signature(self) -> str:
+        return f"dpi={self.dpi};side={self.max_side};gray={int(self.grayscale)};{self.fmt}:{self.quality};max={self.max_bytes}"
+
+    @property
+    def mime_type(self) -> str:
+        return "image/webp" if self.fmt.upper() == "WEBP" else "image/jpeg"
+
+
+def page_dpi(page, settings: RenderSettings) -> float:
+    """Render DPI lowered so the longest side stays within settings.max_side pixels"""
+    longest_pt = max(float(page.width), float(page.height), 1.0)
+    return min(settings.dpi, settings.max_side * 72.0 / longest_pt)
+
+
+def compact_image(img, settings: RenderSettings) -> bytes:
+    """Re-encode a PIL image, stepping quality then scale down until it fits max_bytes"""
+    img = img.convert("L" if settings.grayscale else "RGB")
+    quality = settings.quality
+    while True:
+        buf = io.BytesIO()
+        img.save(buf, format=settings.fmt.upper(), quality=quality, optimize=True)
+        data = buf.getvalue()
+        if len(data) <= settings.max_bytes or min(img.size) < 400:
+            return data
+        if quality > 55:
+            quality -= 15
+        else:
+            img = img.resize((int(img.width * 0.8), int(img.height * 0.8)))
+
+
+def iter_page_payloads(pdf_file, page_numbers, settings: RenderSettings = RenderSettings()):
+    """Yield (page_num, {"mime_type", "data"}) one page at a time.
+
+    Each page is rendered, compacted and released before the next is touched,
+    so peak memory does not grow with the page range.
+    """
+    pdf_file.seek(0)
+    with pdfplumber.open(pdf_file) as pdf:
+        for page_num in sorted(page_numbers):
+            if not 1 <= page_num <= len(pdf.pages):
+                continue
+            with span("pdf.rasterize", "pdf", page=page_num) as s:
+                page = pdf.pages[page_num - 1]
+                rendered = page.to_image(resolution=page_dpi(page, settings))
+                data = compact_image(rendered.original, settings)
+                del rendered
+                page.flush_cache()
+                s.add(len(data))
+            yield page_num, {"mime_type": settings.mime_type, "data": data}
+
+
+class PdfDocument:
+    """One uploaded PDF parsed once and reused across reruns and sessions.
+
+    Holds the page count, page sizes, text-layer classification and the
+    compacted page renders already produced, so widget interactions never
+    re-open the file and repeated extractions skip rasterization.
+    """
+
+    def __init__(self, data: bytes, file_hash: str, max_render_bytes: int = 64 * 1024 * 1024):
+        self.data = data
+        self.hash = file_hash
+        with span("pdf.open", "pdf") as s, pdfplumber.open(io.BytesIO(data)) as pdf:
+            self.page_sizes = [(float(p.width), float(p.height)) for p in pdf.pages]
+            s.add(len(data), pages=len(self.page_sizes))
+        self.page_count = len(self.page_sizes)
+        self.max_render_bytes = max_render_bytes
+        self._layers = {}
+        self._rendered = OrderedDict()
+        self._render_bytes = 0
+        self._lock = threading.Lock()
+
+    def text_layers(self, start_page: int, end_page: int) -> dict:
+        pages = range(max(1, start_page), min(self.page_count, end_page) + 1)
+        with self._lock:
+            todo = [n for n in pages if n not in self._layers]
+        if todo:
+            with span("pdf.text_layer", "pdf", pages=len(todo)):
+                layers = extract_text_layers(io.BytesIO(self.data), todo[0], todo[-1])
+            with self._lock:
+                self._layers.update(layers)
+        with self._lock:
+            return {n: self._layers.get(n) for n in pages}
+
+    def payloads(self, page_numbers, settings: RenderSettings = RenderSettings()):
+        """Like iter_page_payloads, but serves pages rendered earlier with the same settings"""
+        sig = settings.signature
+        todo = []
+        for n in sorted(page_numbers):
+            with self._lock:
+                blob = self._rendered.get((n, sig))
+                if blob is not None:
+                    self._rendered.move_to_end((n, sig))
+            if blob is None:
+                todo.append(n)
+            else:
+                yield n, blob
+        for n, blob in iter_page_payloads(io.BytesIO(self.data), todo, settings):
+            self._remember((n, sig), blob)
+            yield n, blob
+
+    def _remember(self, key, blob):
+        with self._lock:
+            if key in self._rendered:
+                return
+            self._rendered[key] = blob
+            self._render_bytes += len(blob["data"])
+            while self._render_bytes > self.max_render_bytes and len(self._rendered) > 1:
+                _, old = self._rendered.popitem(last=False)
+                self._render_bytes -= len(old["data"])
@@ -0,0 +1,117 @@
+import math
+
+from reportlab.graphics.charts.barcharts import HorizontalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Circle, Drawing, Line, String
+from reportlab.lib import colors
+
+from utils.charts import TOPIC_COLORS, WORD_CLOUD_INCHES
+
+# Pixels per inch of page for charts that stay raster (the word cloud)
+PRINT_DPI = 200
+
+
+def keyword_bars_drawing(word_freq, width, height, font="Helvetica"):
+    rows = sorted(word_freq, key=lambda kv: kv[1])
+    d = Drawing(width, height)
+    chart = HorizontalBarChart()
+    chart.x, chart.y = 90, 24
+    chart.width, chart.height = width - chart.x - 12, height - chart.y - 24
+    chart.data = [[c for _, c in rows]]
+    chart.categoryAxis.categoryNames = [k for k, _ in rows]
+    chart.categoryAxis.labels.fontName = font
+    chart.categoryAxis.labels.fontSize = 6 if len(rows) > 20 else 8
+    chart.categoryAxis.labels.boxAnchor = "e"
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontName = font
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.forceZero = 1
+    chart.bars[0].fillColor = colors.HexColor("#74a9ff")
+    chart.bars[0].strokeColor = None
+    d.add(chart)
+    d.add(String(width / 2, height - 12, f"Top {len(rows)} Keywords", fontName=font, fontSize=10, textAnchor="middle"))
+    return d
+
+
+def topic_pie_drawing(pie, width, height, font="Helvetica"):
+    labels, weights = pie
+    d = Drawing(width, height)
+    size = min(height - 30, width * 0.45)
+    chart = Pie()
+    chart.x, chart.y = 10, (height - 20 - size) / 2
+    chart.width = chart.height = size
+    chart.data = list(weights)
+    total = sum(weights) or 1.0
+    chart.labels = [f"{100 * w / total:.1f}%" for w in weights]
+    chart.simpleLabels = 1
+    chart.slices.fontName = font
+    chart.slices.fontSize = 7
+    chart.slices.strokeColor = colors.white
+    chart.slices.labelRadius = 0.65
+    for i in range(len(weights)):
+        chart.slices[i].fillColor = colors.HexColor(TOPIC_COLORS[i % len(TOPIC_COLORS)])
+    d.add(chart)
+    legend = Legend()
+    legend.x, legend.y = chart.x + size + 20, chart.y + size
+    legend.fontName = font
+    legend.fontSize = 7
+    legend.alignment = "right"
+    legend.columnMaximum = 10
+    legend.colorNamePairs = [(colors.HexColor(TOPIC_COLORS[i % len(TOPIC_COLORS)]), label)
+                             for i, label in enumerate(labels)]
+    d.add(legend)
+    d.add(String(width / 2, height - 12, "Topic Distribution", fontName=font, fontSize=11, textAnchor="middle"))
+    return d
+
+
+def concept_graph_drawing(graph, width, height, font="Helvetica"):
+    """Same encoding as draw_concept_graph: node area ~ size, edge width ~ weight, type -> colour"""
+    G, pos = graph
+    d = Drawing(width, height)
+    if not len(G):
+        return d
+    xs = [float(p[0]) for p in pos.values()]; ys = [float(p[1]) for p in pos.values()]
+    pad = 24
+    sx = (width - 2 * pad) / ((max(xs) - min(xs)) or 1)
+    sy = (height - 2 * pad) / ((max(ys) - min(ys)) or 1)
+    # Matplotlib's figure is 10in wide; keep marker sizes proportional to the drawing
+    k = width / 720.0
+    xy = {n: (pad + (float(pos[n][0]) - min(xs)) * sx, pad + (float(pos[n][1]) - min(ys)) * sy) for n in G}
+    max_w = max([G[u][v]["weight"] for u, v in G.edges], default=1)
+    for u, v in G.edges:
+        line = Line(*xy[u], *xy[v], strokeColor=colors.HexColor("#555555"),
+                    strokeWidth=(0.5 + 4 * G[u][v]["weight"] / max_w) * k)
+        line.strokeOpacity = 0.3
+        d.add(line)
+    for n in G:
+        t = G.nodes[n].get("type", "keyword")
+        fill = "#ff7f0e" if t == "topic" else "#1f77b4" if t == "term" else "#2ca02c"
+        r = math.sqrt(G.nodes[n].get("size", 10) * 30) / 2 * k
+        node = Circle(*xy[n], r, fillColor=colors.HexColor(fill), strokeColor=colors.HexColor("#333333"), strokeWidth=0.4)
+        node.fillOpacity = 0.85
+        d.add(node)
+    for n in G:
+        if G.nodes[n].get("size", 10) >= 18 or G.nodes[n].get("type") == "topic":
+            d.add(String(xy[n][0], xy[n][1] - 3, str(n), fontName=font, fontSize=7, textAnchor="middle"))
+    return d
+
+
+# Charts drawn as native ReportLab vector graphics: kind -> (builder, height/width)
+BUILDERS = {
+    "keyword_freq": (keyword_bars_drawing, 0.6),
+    "topic_pie": (topic_pie_drawing, 0.6),
+    "concept_graph": (concept_graph_drawing, 0.6),
+}
+
+
+def vector_drawing(kind, data, width, max_h, font="Helvetica"):
+    """ReportLab Drawing for a chart kind, sized to the content width and the section's max height"""
+    build, aspect = BUILDERS[kind]
+    return build(data, width, min(max_h, width * aspect), font=font)
+
+
+def raster_dpi(max_w: float, max_h: float, inches=WORD_CLOUD_INCHES, print_dpi: int = PRINT_DPI) -> int:
+    """Figure DPI giving ~print_dpi pixels per inch at the size the image is placed in a max_w x max_h box"""
+    placed_w = min(max_w, max_h * inches[0] / inches[1])
+    return max(50, math.ceil(placed_w / 72.0 * print_dpi / inches[0]))
@@ -0,0 +1,354 @@
+"""Headless Data-Vista: extract -> keywords -> topics -> concept graph -> summary -> PDF over a directory.
+
+    python -m utils.pipeline notes/ -o reports/ --workers 4 --limit summary=1
+    python -m utils.pipeline notes/ -o /tmp/out --model stub:0.05      # offline, no API key
+
+Documents run in parallel across a process pool. Stages that hold heavy models or an
+external quota get a cross-process concurrency limit (--limit stage=n). Each document
+gets <out>/<name>/ with text.txt, summary.txt, report.pdf, report.json (per-stage
+timings and errors) and trace.json (Chrome trace); <out>/index.json lists every document.
+"""
+import argparse
+import importlib
+import json
+import multiprocessing as mp
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+
+from utils.cache import PageCache, content_hash
+from utils.extract import SUPPORTED_SUFFIXES, extract_document
+from utils.gemini import DEFAULT_CONCURRENCY, DEFAULT_PAGES_PER_REQUEST, DEFAULT_RPM, GEMINI_MODEL, StubModel, TokenBucket
+from utils.pdf import RenderSettings
+from utils.trace import Tracer, activate, span
+
+STAGES = ("extract", "keywords", "topics", "graph", "entities", "summary", "pdf")
+DEFAULT_STAGES = ("extract", "keywords", "topics", "graph", "summary", "pdf")
+# Stages bounded across the whole pool; the rest run as wide as the pool
+DEFAULT_LIMITS = {"extract": 2, "entities": 1, "summary": 1}
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    out_dir: str = "reports"
+    model: str = "gemini"
+    stages: tuple = DEFAULT_STAGES
+    limits: dict = field(default_factory=lambda: dict(DEFAULT_LIMITS))
+    workers: int = 0
+    rpm: float = DEFAULT_RPM
+    page_workers: int = DEFAULT_CONCURRENCY
+    pages_per_request: int = DEFAULT_PAGES_PER_REQUEST
+    use_text_layer: bool = True
+    grayscale: bool = False
+    n_topics: int = 0  # 0 = fit every k and use the recommended one
+    summary_model: str = "sshleifer/distilbart-cnn-12-6"
+    fast: bool = False
+    max_len: int = 150
+    max_summary_chars: int = 800
+    unicode_font: bool = True
+    force: bool = False
+
+
+def make_model(spec: str = "gemini"):
+    """(model, files) for "gemini", "stub[:latency]" or "package.module:factory".
+
+    `files` is the file-upload API used for DOCX (the genai module), or None to read DOCX locally.
+    """
+    if spec == "gemini":
+        import google.generativeai as genai
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY is not set (use --model stub for an offline run)")
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(GEMINI_MODEL), genai
+    if spec.split(":")[0] == "stub":
+        latency = spec.partition(":")[2]
+        return StubModel(latency=float(latency) if latency else 0.05), None
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "make_model")(), None
+
+
+def find_documents(root: str, recursive: bool = False):
+    if os.path.isfile(root):
+        return [root]
+    if recursive:
+        paths = [os.path.join(d, f) for d, _, files in os.walk(root) for f in files]
+    else:
+        paths = [os.path.join(root, f) for f in os.listdir(root)]
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(SUPPORTED_SUFFIXES))
+
+
+def output_name(path: str, root: str) -> str:
+    rel = os.path.relpath(path, root) if os.path.isdir(root) else os.path.basename(path)
+    return re.sub(r"[^\w.-]+", "_", rel.replace(os.sep, "__"))
+
+
+# Per-process state: model, limiter and semaphores from the initializer, heavy models on first use
+_worker = {}
+
+
+def _init_worker(config: PipelineConfig, semaphores: dict):
+    _worker.clear()
+    _worker.update(config=config, semaphores=semaphores)
+    _worker["model"], _worker["files"] = make_model(config.model)
+    # Each extracting process gets its share of the requests-per-minute budget
+    extractors = min(config.workers, config.limits.get("extract") or config.workers)
+    _worker["limiter"] = TokenBucket(config.rpm / max(1, extractors))
+    try:
+        _worker["page_cache"] = PageCache()
+    except Exception:
+        _worker["page_cache"] = None
+    # Worker processes share the cores; the summarizer loads with this thread count
+    _worker["intra_threads"] = max(1, (os.cpu_count() or 1) // config.workers) if config.workers > 1 else None
+
+
+def _resource(name, factory):
+    if name not in _worker:
+        _worker[name] = factory()
+    return _worker[name]
+
+
+def run_stages(path: str, out: str, config: PipelineConfig, data: bytes) -> dict:
+    report = {"source": path, "hash": content_hash(data), "stages": {}, "status": "ok"}
+    results = {}
+
+    def stage(name, fn):
+        if name not in config.stages:
+            return None
+        t0 = time.perf_counter()
+        try:
+            with _worker["semaphores"].get(name) or nullcontext():
+                waited = time.perf_counter() - t0
+                with span(name, "pipeline"):
+                    results[name] = fn()
+            report["stages"][name] = {"seconds": round(time.perf_counter() - t0, 3), "waited": round(waited, 3)}
+        except Exception as e:
+            report["stages"][name] = {"seconds": round(time.perf_counter() - t0, 3), "error": f"{type(e).__name__}: {e}"}
+            report["status"] = "partial"
+        return results.get(name)
+
+    def extract():
+        render = RenderSettings(grayscale=config.grayscale)
+        return extract_document(
+            path, data, _worker["model"], files=_worker["files"], use_text_layer=config.use_text_layer,
+            render=render, cache=_worker["page_cache"], rpm=config.rpm,
+            max_workers=config.page_workers, limiter=_worker["limiter"], pages_per_request=config.pages_per_request,
+        )
+
+    text = stage("extract", extract)
+    if not text or not text.strip():
+        report["status"] = "failed" if "error" in report["stages"].get("extract", {}) else "empty"
+        return report
+    with open(os.path.join(out, "text.txt"), "w", encoding="utf-8") as f:
+        f.write(text)
+
+    from utils.text import analyze
+    analysis = analyze(text)
+    report["words"] = len(analysis.tokens)
+
+    word_freq = stage("keywords", lambda: analysis.counts.most_common(25))
+    if word_freq:
+        report["keywords"] = word_freq
+
+    def topics():
+        from utils.topics import sweep_topics, topic_model
+        if config.n_topics:
+            return topic_model(text, config.n_topics)
+        # With several document workers they already fill the cores; alone, the k-sweep fans out itself
+        sweep = sweep_topics(text, max_workers=1 if config.workers > 1 else None)
+        return sweep and sweep["results"][sweep["recommended"]]
+
+    topic_res = stage("topics", topics)
+    if topic_res:
+        report["topics"] = {"terms": topic_res["topic_terms"], "weights": [float(w) for w in topic_res["topic_weights"]],
+                            "coherence": topic_res["coherence"]}
+
+    def graph():
+        from utils.graph import build_concept_graph, layout_graph, prune_graph
+        G = prune_graph(build_concept_graph(analysis.tokens, topic_res, counts=analysis.counts))
+        return G, layout_graph(G)
+
+    concept = stage("graph", graph)
+    if concept:
+        report["graph"] = {"nodes": concept[0].number_of_nodes(), "edges": concept[0].number_of_edges()}
+
+    def entities():
+        from utils.nlp import extract_entities, load_ner
+        spans = extract_entities(_resource("ner", load_ner), text)
+        return [(t, l) for t, l, _, _ in spans][:50]
+
+    ents = stage("entities", entities) or []
+    if ents:
+        report["entities"] = ents
+
+    def summary():
+        from utils.summarize import load_summarizer, map_reduce_summary
+        summarizer = _resource("summarizer", lambda: load_summarizer(config.summary_model, fast=config.fast,
+                                                                     intra=_worker["intra_threads"]))
+        final, _ = map_reduce_summary(summarizer, text.strip(), max_len=config.max_len,
+                                      min_len=max(30, config.max_len // 3))
+        return final
+
+    final = stage("summary", summary) or ""
+    if final:
+        with open(os.path.join(out, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(final)
+
+    def pdf():
+        from reportlab.lib.units import cm
+        from utils.charts import word_cloud_png
+        from utils.pdf_charts import raster_dpi, vector_drawing
+        from utils.report import CONTENT_W, build_report, register_fonts
+        font = register_fonts(config.unicode_font)[0]
+        charts = []
+        if word_freq:
+            charts.append(("Keyword Frequency", vector_drawing("keyword_freq", word_freq, CONTENT_W, 9*cm, font), 9*cm))
+            freqs = tuple(analysis.counts.most_common(150))
+            charts.append(("Word Cloud", word_cloud_png(freqs, raster_dpi(CONTENT_W, 9*cm)), 9*cm))
+        if topic_res:
+            pie = ([f"Topic {i+1}: " + ", ".join(t[:4]) for i, t in enumerate(topic_res["topic_terms"])],
+                   [float(w) for w in topic_res["topic_weights"]])
+            charts.append(("Topic Distribution", vector_drawing("topic_pie", pie, CONTENT_W, 9*cm, font), 9*cm))
+        if concept:
+            charts.append(("Concept Graph", vector_drawing("concept_graph", concept, CONTENT_W, 11*cm, font), 11*cm))
+        pdf_bytes = build_report(summary=final, entities=ents, charts=charts, max_summary_chars=config.max_summary_chars,
+                                 unicode_font=config.unicode_font)
+        with open(os.path.join(out, "report.pdf"), "wb") as f:
+            f.write(pdf_bytes)
+        return len(pdf_bytes)
+
+    pdf_size = stage("pdf", pdf)
+    if pdf_size:
+        report["pdf_bytes"] = pdf_size
+    return report
+
+
+def process_document(path: str, name: str) -> dict:
+    """Run the configured stages on one file inside a worker; never raises"""
+    config = _worker["config"]
+    out = os.path.join(config.out_dir, name)
+    report_path = os.path.join(out, "report.json")
+    t0 = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not config.force and os.path.exists(report_path):
+            with open(report_path, encoding="utf-8") as f:
+                previous = json.load(f)
+            if (previous.get("hash") == content_hash(data) and previous.get("status") == "ok"
+                    and previous.get("config") == _config_signature(config)):
+                return {**previous, "skipped": True}
+        os.makedirs(out, exist_ok=True)
+        tracer = Tracer()
+        with activate(tracer):
+            report = run_stages(path, out, config, data)
+        with open(os.path.join(out, "trace.json"), "w", encoding="utf-8") as f:
+            f.write(tracer.to_chrome_trace())
+        report["timings"] = tracer.summary()
+    except Exception as e:
+        report = {"source": path, "stages": {}, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+        os.makedirs(out, exist_ok=True)
+    report.update(name=name, seconds=round(time.perf_counter() - t0, 3), config=_config_signature(config))
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    return report
+
+
+def _config_signature(config: PipelineConfig) -> str:
+    # Settings that change outputs; concurrency and paths do not
+    c = asdict(config)
+    return content_hash(repr([c[k] for k in ("model", "stages", "use_text_layer", "grayscale", "n_topics",
+                                              "summary_model", "fast", "max_len", "max_summary_chars", "unicode_font")]))
+
+
+def run_batch(root: str, config: PipelineConfig, recursive: bool = False, on_done=None) -> list:
+    """Process every supported document under `root`; returns the per-document reports"""
+    paths = find_documents(root, recursive)
+    os.makedirs(config.out_dir, exist_ok=True)
+    workers = max(1, min(config.workers or os.cpu_count() or 1, len(paths) or 1))
+    config = PipelineConfig(**{**asdict(config), "workers": workers})
+    # spawn, not fork: each worker starts clean instead of copying this process and its threads' locks
+    ctx = mp.get_context("spawn")
+    semaphores = {name: ctx.BoundedSemaphore(n) for name, n in config.limits.items() if n and n < workers}
+    jobs = [(p, output_name(p, root)) for p in paths]
+    reports = []
+    if workers == 1:
+        _init_worker(config, semaphores)
+        for job in jobs:
+            reports.append(process_document(*job))
+            if on_done:
+                on_done(reports[-1], len(reports), len(jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(config, semaphores)) as pool:
+            futures = [pool.submit(process_document, *job) for job in jobs]
+            for fut in as_completed(futures):
+                reports.append(fut.result())
+                if on_done:
+                    on_done(reports[-1], len(reports), len(jobs))
+    reports.sort(key=lambda r: r["name"])
+    with open(os.path.join(config.out_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump([{k: r.get(k) for k in ("name", "source", "status", "seconds", "skipped")} for r in reports], f, indent=2)
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="Directory (or single file) of PDF, DOCX, TXT, PNG or JPG documents")
+    parser.add_argument("-o", "--out", default="reports")
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("--model", default="gemini", help='"gemini", "stub[:latency]" or "package.module:factory"')
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES), help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--workers", type=int, default=0, help="Documents in parallel (default: CPU count)")
+    parser.add_argument("--limit", action="append", default=[], metavar="STAGE=N",
+                        help=f"Max documents in a stage at once (default: {DEFAULT_LIMITS})")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="Gemini requests per minute, shared by all workers")
+    parser.add_argument("--page-workers", type=int, default=DEFAULT_CONCURRENCY, help="Concurrent page requests per document")
+    parser.add_argument("--pages-per-request", type=int, default=DEFAULT_PAGES_PER_REQUEST,
+                        help="PDF page images per Gemini request (1 = one request per page)")
+    parser.add_argument("--no-text-layer", action="store_true", help="OCR every PDF page, even born-digital ones")
+    parser.add_argument("--grayscale", action="store_true")
+    parser.add_argument("--topics", type=int, default=0, help="Number of topics (default: recommended by a k-sweep)")
+    parser.add_argument("--summary-model", default="sshleifer/distilbart-cnn-12-6")
+    parser.add_argument("--fast", action="store_true", help="int8 summarizer")
+    parser.add_argument("--max-len", type=int, default=150)
+    parser.add_argument("--force", action="store_true", help="Reprocess documents whose report is up to date")
+    args = parser.parse_args(argv)
+
+    stages = tuple(s.strip() for s in args.stages.split(",") if s.strip())
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    limits = dict(DEFAULT_LIMITS)
+    for item in args.limit:
+        stage_name, _, n = item.partition("=")
+        if stage_name not in STAGES or not n.isdigit():
+            parser.error(f"bad --limit {item!r}, expected STAGE=N")
+        limits[stage_name] = int(n)
+    if "extract" not in stages:
+        stages = ("extract",) + stages
+
+    config = PipelineConfig(
+        out_dir=args.out, model=args.model, stages=stages, limits=limits, workers=args.workers,
+        rpm=args.rpm, page_workers=args.page_workers, pages_per_request=args.pages_per_request,
+        use_text_layer=not args.no_text_layer,
+        grayscale=args.grayscale, n_topics=args.topics, summary_model=args.summary_model,
+        fast=args.fast, max_len=args.max_len, force=args.force,
+    )
+
+    def on_done(report, done, total):
+        state = "skipped" if report.get("skipped") else report["status"]
+        print(f"[{done}/{total}] {report['name']}: {state} ({report.get('seconds', 0):.1f}s)", flush=True)
+
+    reports = run_batch(args.input, config, recursive=args.recursive, on_done=on_done)
+    failed = [r for r in reports if r["status"] == "failed"]
+    print(f"{len(reports)} document(s), {len(failed)} failed -> {os.path.abspath(args.out)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import io
+import os
+import re
+import textwrap
+import threading
+import unicodedata
+from datetime import datetime
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from utils.cache import LRUCache
+from utils.trace import span
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+
+PAGE_SIZE = A4
+W, H = PAGE_SIZE
+MARGIN_L = 2.0 * cm
+MARGIN_R = 2.0 * cm
+MARGIN_T = 1.8 * cm
+MARGIN_B = 1.6 * cm
+CONTENT_W = W - (MARGIN_L + MARGIN_R)
+
+LINE = 14
+GAP_AFTER_H1 = 14
+GAP_AFTER_H2 = 10
+GAP_AFTER_PARAGRAPH = 8
+GAP_AFTER_IMAGE = 14
+TOP_OFFSET = 0.8 * cm
+FOOT_CLEAR = 1.2 * cm
+
+# Finished PDFs by a hash of their inputs
+REPORTS = LRUCache(max_entries=16, max_bytes=64 * 1024 * 1024)
+
+_fonts = {}
+_fonts_lock = threading.Lock()
+
+
+def register_fonts(unicode_font: bool = True):
+    """(body, bold) font names; the DejaVu TTFs are parsed and registered once per process"""
+    if not unicode_font:
+        return "Helvetica", "Helvetica-Bold"
+    with _fonts_lock:
+        if "unicode" not in _fonts:
+            try:
+                pdfmetrics.registerFont(TTFont("DejaVuSans", os.path.join(FONT_DIR, "DejaVuSans.ttf")))
+                pdfmetrics.registerFont(TTFont("DejaVuSans-Bold", os.path.join(FONT_DIR, "DejaVuSans-Bold.ttf")))
+                _fonts["unicode"] = ("DejaVuSans", "DejaVuSans-Bold")
+            except Exception:
+                _fonts["unicode"] = ("Helvetica", "Helvetica-Bold")
+        return _fonts["unicode"]
+
+
+def sanitize_for_pdf(s: str) -> str:
+    s = unicodedata.normalize("NFKC", s or "")
+    s = s.replace("\u00A0", " ")
+    s = (s.replace("\u2013", "-")
+           .replace("\u2014", "-")
+           .replace("\u2018", "'")
+           .replace("\u2019", "'")
+           .replace("\u201C", '"')
+           .replace("\u201D", '"')
+           .replace("\u2022", "•"))
+    s = re.sub(r"[^\x09\x0A\x0D\x20-\x7E•]", " ", s)
+    return s
+
+
+def report_stamp() -> str:
+    """Header timestamp; cached PDFs must include it in their key"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M")
+
+
+class Report:
+    """Canvas plus layout state for one report, written into an in-memory buffer"""
+
+    def __init__(self, add_headers: bool = True, unicode_font: bool = True, title: str = "Data‑Vista Report",
+                 stamp: str = None):
+        self.buf = io.BytesIO()
+        self.c = canvas.Canvas(self.buf, pagesize=PAGE_SIZE)
+        self.c.setTitle(title)
+        self.add_headers = add_headers
+        self.font_body, self.font_bold = register_fonts(unicode_font)
+        self.stamp = stamp or report_stamp()
+        self.page = 0
+        self.y = 0
+
+    def header_footer(self):
+        if not self.add_headers:
+            return
+        c = self.c
+        c.setStrokeColorRGB(0.8,0.8,0.8)
+        c.setLineWidth(0.3)
+        c.line(MARGIN_L, H - MARGIN_T + 0.6*cm, W - MARGIN_R, H - MARGIN_T + 0.6*cm)
+        c.setFont(self.font_bold, 9)
+        c.drawString(MARGIN_L, H - MARGIN_T + 0.75*cm, "Data‑Vista Report")
+        c.setFont(self.font_body, 9)
+        c.drawRightString(W - MARGIN_R, H - MARGIN_T + 0.75*cm, self.stamp)
+        c.setFont(self.font_body, 9)
+        c.drawRightString(W - MARGIN_R, MARGIN_B - 0.9*cm, f"Page {self.page}")
+
+    def new_page(self):
+        if self.page > 0:
+            self.c.showPage()
+        self.page += 1
+        self.header_footer()
+        self.y = H - MARGIN_T - TOP_OFFSET
+
+    def draw_h1(self, text):
+        self.c.setFont(self.font_bold, 16); self.c.drawString(MARGIN_L, self.y, sanitize_for_pdf(text))
+        self.y -= GAP_AFTER_H1 + LINE
+
+    def draw_h2(self, text):
+        self.c.setFont(self.font_bold, 12); self.c.drawString(MARGIN_L, self.y, sanitize_for_pdf(text))
+        self.y -= GAP_AFTER_H2 + int(LINE * 0.6)
+
+    def draw_body(self, text, max_width=CONTENT_W):
+        """Wrapped paragraph; starts a new page (dropping the rest) when it reaches the footer"""
+        self.c.setFont(self.font_body, 10)
+        for line in textwrap.wrap(sanitize_for_pdf(text), width=int(max_width/6)):
+            if self.y < MARGIN_B + FOOT_CLEAR:
+                self.new_page()
+                return
+            self.c.drawString(MARGIN_L, self.y, line)
+            self.y -= LINE
+        self.y -= GAP_AFTER_PARAGRAPH
+
+    def fits(self, h):
+        return self.y - h >= MARGIN_B + FOOT_CLEAR
+
+    def draw_image(self, img: ImageReader, max_w=CONTENT_W, max_h=10*cm):
+        """Draw a decoded image; returns False (drawing nothing) when it does not fit the page"""
+        try:
+            iw, ih = img.getSize()
+            scale = min(max_w/iw, max_h/ih, 1.0)
+            w, h = iw*scale, ih*scale
+            if not self.fits(h):
+                return False
+            self.c.drawImage(img, MARGIN_L, self.y - h, width=w, height=h, preserveAspectRatio=True, mask='auto')
+            self.y -= h + GAP_AFTER_IMAGE
+        except Exception:
+            pass
+        return True
+
+    def section_image(self, title, png: bytes, max_h):
+        try:
+            img = ImageReader(io.BytesIO(png))  # decoded once, reused for size and drawing
+        except Exception:
+            return
+        self.draw_h2(title)
+        if not self.draw_image(img, max_h=max_h):
+            self.new_page()
+            self.draw_image(img, max_h=max_h)
+
+    def draw_drawing(self, d: Drawing):
+        """Draw vector graphics straight onto the canvas; returns False when it does not fit the page"""
+        if not self.fits(d.height):
+            return False
+        renderPDF.draw(d, self.c, MARGIN_L, self.y - d.height)
+        self.y -= d.height + GAP_AFTER_IMAGE
+        return True
+
+    def section_drawing(self, title, d: Drawing):
+        self.draw_h2(title)
+        if not self.draw_drawing(d):
+            self.new_page()
+            self.draw_drawing(d)
+
+    def finish(self) -> bytes:
+        self.c.showPage(); self.c.save()
+        return self.buf.getvalue()
+
+
+def build_report(summary: str = "", entities=(), charts=(), max_summary_chars: int = 800,
+                 add_headers: bool = True, unicode_font: bool = True, stamp: str = None) -> bytes:
+    """PDF bytes for a summary, entity sample and [(title, png_bytes | Drawing, max_h), ...] charts"""
+    with span("report.build", "report", charts=len(charts)) as s:
+        pdf = _build_report(summary, entities, charts, max_summary_chars, add_headers, unicode_font, stamp)
+        s.add(len(pdf))
+    return pdf
+
+
+def _build_report(summary, entities, charts, max_summary_chars, add_headers, unicode_font, stamp) -> bytes:
+    r = Report(add_headers=add_headers, unicode_font=unicode_font, stamp=stamp)
+    r.new_page()
+    r.draw_h1("Data‑Vista: Visual Summary Report")
+
+    if summary:
+        if len(summary) > max_summary_chars:
+            summary = summary[:max_summary_chars].rsplit(" ", 1)[0] + " ..."
+        r.draw_h2("Summary")
+        r.draw_body(summary)
+
+    if entities:
+        r.draw_h2("Named Entities (sample)")
+        r.draw_body(", ".join([f"{t} ({l})" for t,l in list(entities)[:40]]))
+
+    for title, chart, max_h in charts:
+        if isinstance(chart, Drawing):
+            r.section_drawing(title, chart)
+        else:
+            r.section_image(title, chart, max_h)
+
+    return r.finish()
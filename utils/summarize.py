@@ -0,0 +1,198 @@
+import io
+import os
+import zlib
+from collections import Counter
+
+from utils.cache import LRUCache, content_hash
+from utils.text import SENTENCE_END_RE
+from utils.trace import span
+
+try:
+    import psutil
+except ImportError:  # optional; logical CPUs are used instead
+    psutil = None
+
+# Content-defined cut points: a segment whose crc32 hits this modulus starts a new piece once
+# the current one is at least half full, so an edit only reshapes the chunks near it
+CHUNK_ANCHOR_EVERY = 24
+REDUCE_ANCHOR_EVERY = 4
+
+# Partial summaries by (input hash, model, max_len, min_len); shared by every session
+SUMMARY_MEMO = LRUCache(max_entries=int(os.getenv("DATA_VISTA_SUMMARY_MEMO", "4096")))
+
+INTRA_THREADS = int(os.getenv("DATA_VISTA_INTRA_THREADS", "0")) or None
+INTER_THREADS = int(os.getenv("DATA_VISTA_INTER_THREADS", "0")) or None
+
+
+def configure_threads(intra: int = INTRA_THREADS, inter: int = INTER_THREADS):
+    """Pin torch intra-op / inter-op thread pools (process-wide; inter-op can only be set once)"""
+    import torch
+    if intra:
+        torch.set_num_threads(intra)
+    if inter:
+        try:
+            torch.set_num_interop_threads(inter)
+        except RuntimeError:
+            pass  # already set, or parallel work has started
+
+
+def physical_cores() -> int:
+    n = psutil.cpu_count(logical=False) if psutil else None
+    return n or os.cpu_count() or 1
+
+
+def load_summarizer(model_name: str = "sshleifer/distilbart-cnn-12-6", fast: bool = False,
+                    intra: int = None, inter: int = None):
+    """Summarization pipeline; `fast` applies dynamic int8 quantization to the Linear layers.
+
+    `fast` also pins torch's thread pools: intra-op to the physical cores and inter-op
+    to 1, unless given here or by DATA_VISTA_INTRA_THREADS / DATA_VISTA_INTER_THREADS.
+    """
+    import torch
+    from transformers import pipeline
+    intra, inter = intra or INTRA_THREADS, inter or INTER_THREADS
+    if fast:
+        intra, inter = intra or physical_cores(), inter or 1
+    configure_threads(intra, inter)
+    summarizer = pipeline("summarization", model=model_name, device=-1)
+    summarizer.model.eval()
+    if fast:
+        summarizer.model = torch.quantization.quantize_dynamic(summarizer.model, {torch.nn.Linear}, dtype=torch.qint8)
+    summarizer.mode = "int8" if fast else "fp32"
+    # What torch actually uses (inter-op cannot change once set)
+    summarizer.threads = (torch.get_num_threads(), torch.get_num_interop_threads())
+    return summarizer
+
+
+def model_key(summarizer) -> str:
+    name = getattr(summarizer.model, "name_or_path", None) or type(summarizer.model).__name__
+    threads = getattr(summarizer, "threads", None)
+    return f"{name}:{getattr(summarizer, 'mode', 'fp32')}" + (f":{threads[0]}x{threads[1]}" if threads else "")
+
+
+def model_bytes(model) -> int:
+    """Serialized weight size, which also accounts for packed int8 weights"""
+    import torch
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+
+def summary_parity(reference: str, candidate: str) -> float:
+    """Unigram F1 between two summaries (1.0 = same words)"""
+    ref, cand = Counter(reference.lower().split()), Counter(candidate.lower().split())
+    overlap = sum((ref & cand).values())
+    if not overlap:
+        return 0.0
+    p, r = overlap / sum(cand.values()), overlap / sum(ref.values())
+    return 2 * p * r / (p + r)
+
+
+def token_limit(tokenizer, cap: int = 1024) -> int:
+    """Usable input tokens per chunk (model max minus room for special tokens)"""
+    model_max = getattr(tokenizer, "model_max_length", cap) or cap
+    return min(model_max, cap) - tokenizer.num_special_tokens_to_add()
+
+
+def is_anchor(segment: str, every: int) -> bool:
+    return bool(every) and zlib.crc32(segment.encode("utf-8")) % every == 0
+
+
+def pack_segments(segments, tokenizer, max_tokens: int, anchor_every: int = None, min_tokens: int = None):
+    """Greedily join segments into pieces of at most max_tokens; oversized segments are split by tokens.
+
+    With `anchor_every`, anchor segments (see is_anchor) also start a new piece, but only
+    once the current one holds `min_tokens` (default max_tokens // 2): pieces stay near
+    the model limit while an edit still only reshapes the pieces around it.
+    """
+    min_tokens = max_tokens // 2 if min_tokens is None else min_tokens
+    if not segments:
+        return []
+    lengths = [len(ids) for ids in tokenizer(segments, add_special_tokens=False)["input_ids"]]
+    pieces, cur, cur_len = [], [], 0
+    for seg, n in zip(segments, lengths):
+        if n > max_tokens:
+            if cur:
+                pieces.append(" ".join(cur)); cur, cur_len = [], 0
+            ids = tokenizer(seg, add_special_tokens=False)["input_ids"]
+            for i in range(0, len(ids), max_tokens):
+                pieces.append(tokenizer.decode(ids[i:i + max_tokens], skip_special_tokens=True))
+            continue
+        if cur and (cur_len + n + 1 > max_tokens or (cur_len >= min_tokens and is_anchor(seg, anchor_every))):
+            pieces.append(" ".join(cur)); cur, cur_len = [], 0
+        cur.append(seg); cur_len += n + 1
+    if cur:
+        pieces.append(" ".join(cur))
+    return pieces
+
+
+def token_chunks(text: str, tokenizer, max_tokens: int = None):
+    """Sentence-aligned chunks that each fit the model's real input limit, covering the whole text"""
+    max_tokens = max_tokens or token_limit(tokenizer)
+    sentences = [s for s in SENTENCE_END_RE.split(text.strip()) if s.strip()]
+    return pack_segments(sentences, tokenizer, max_tokens, anchor_every=CHUNK_ANCHOR_EVERY)
+
+
+def summarize_texts(summarizer, texts, max_len: int, min_len: int, batch_size: int = 4):
+    """One batched pipeline call over many inputs"""
+    import torch
+    if not texts:
+        return []
+    with torch.inference_mode():
+        results = summarizer(
+            list(texts),
+            max_length=max_len,
+            min_length=min_len,
+            do_sample=False,
+            truncation=True,
+            batch_size=batch_size,
+        )
+    return [r["summary_text"] if isinstance(r, dict) else r[0]["summary_text"] for r in results]
+
+
+def map_reduce_summary(summarizer, text: str, max_len: int = 150, min_len: int = None,
+                       batch_size: int = 4, on_progress=None, memo: LRUCache = SUMMARY_MEMO):
+    """Summarize a document of any length: batched map over token chunks, then a reduce tree.
+
+    Every map and reduce input is memoized by content, so after a small edit only
+    the touched chunk and the reduce nodes above it go through the model.
+    Returns (final, partials). `on_progress(stage, done, total)` is called after each batch.
+    """
+    tokenizer = summarizer.tokenizer
+    limit = token_limit(tokenizer)
+    min_len = min_len if min_len is not None else max(30, max_len // 3)
+    mkey = model_key(summarizer)
+
+    def run(stage, inputs):
+        if not inputs:
+            return []
+        keys = [content_hash(x, mkey, str(max_len), str(min_len)) for x in inputs]
+        out = [memo.get(k) if memo is not None else None for k in keys]
+        todo = [i for i, o in enumerate(out) if o is None]
+        if on_progress:
+            on_progress(stage, len(inputs) - len(todo), len(inputs))
+        for b in range(0, len(todo), batch_size):
+            idx = todo[b:b + batch_size]
+            with span("summarize.batch", "summarize", stage=stage, chunks=len(idx)) as s:
+                s.add(sum(len(inputs[i]) for i in idx))
+                summaries = summarize_texts(summarizer, [inputs[i] for i in idx], max_len, min_len, batch_size)
+            for i, summary in zip(idx, summaries):
+                out[i] = summary
+                if memo is not None:
+                    memo.put(keys[i], summary)
+            if on_progress:
+                on_progress(stage, len(inputs) - len(todo) + b + len(idx), len(inputs))
+        return out
+
+    chunks = token_chunks(text, tokenizer, limit)
+    partials = run("map", chunks)
+    level, depth = partials, 0
+    while len(level) > 1:
+        depth += 1
+        groups = pack_segments(level, tokenizer, limit, anchor_every=REDUCE_ANCHOR_EVERY)
+        if len(groups) >= len(level):
+            # Summaries too long to pack: fall back to pairing so the tree still shrinks
+            groups = [" ".join(level[i:i + 2]) for i in range(0, len(level), 2)]
+        level = run(f"reduce {depth}", groups)
+    final = level[0] if level else ""
+    return final, partials
@@ -0,0 +1,161 @@
+import re
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+
+from utils.cache import LRUCache, content_hash
+from utils.trace import span
+
+STOPWORDS = frozenset("""
+a an the and or but if then else for while of to from in on at by with without within over under into out up down
+is are was were be been being have has had do does did as that this these those it its itself themselves himself herself
+you your yours we our ours they their theirs he him she her i me my mine not no nor so such than too very can could
+should would will just also more most some any each other about above after again against all am between both before
+during further here there when where why how only own same until once
+""".split())
+
+WORD_RE = re.compile(r"[A-Za-z](?:[A-Za-z'-]*[A-Za-z])?")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+# Page boundaries written by extract.join_pages; the blank lines before a marker belong to it
+PAGE_MARK_RE = re.compile(r"(?:\A|\n+)--- Page (\d+) ---\n")
+VIEW_CHARS = 20_000
+
+
+def basic_clean(text: str) -> str:
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"[^\x09\x0A\x0D\x20-\x7E]", " ", text)
+    return text.strip()
+
+
+def is_keyword(token: str) -> bool:
+    return len(token) > 2 and token not in STOPWORDS
+
+
+def tokenize(text: str):
+    tokens = (m.group(0).lower() for m in WORD_RE.finditer(text))
+    return [t for t in tokens if is_keyword(t)]
+
+
+@dataclass
+class TextAnalysis:
+    """Everything the analysis pages need from one pass over a text"""
+    text_hash: str
+    cleaned: str
+    tokens: list                                          # keywords in document order
+    positions: array = field(default_factory=lambda: array("q"))  # char offset of each token in `cleaned`
+    sentences: list = field(default_factory=list)         # (start, end) spans in `cleaned`
+    counts: Counter = field(default_factory=Counter)
+
+    def sentence_texts(self, min_words: int = 0):
+        out = (self.cleaned[s:e] for s, e in self.sentences)
+        return [s for s in out if len(s.split()) >= min_words] if min_words else list(out)
+
+
+def _analyze(text: str, text_hash: str) -> TextAnalysis:
+    cleaned = basic_clean(text)
+    tokens, positions = [], array("q")
+    for m in WORD_RE.finditer(cleaned):
+        tok = m.group(0).lower()
+        if is_keyword(tok):
+            tokens.append(tok)
+            positions.append(m.start())
+    sentences, start = [], 0
+    for m in SENTENCE_END_RE.finditer(cleaned):
+        sentences.append((start, m.start()))
+        start = m.end()
+    if start < len(cleaned):
+        sentences.append((start, len(cleaned)))
+    return TextAnalysis(text_hash, cleaned, tokens, positions, sentences, Counter(tokens))
+
+
+# Process-wide, so every page and every session sees the same single pass per text
+_ANALYSES = LRUCache(max_entries=16)  # results are shared: treat them as read-only
+
+
+def analyze(text: str) -> TextAnalysis:
+    """Cleaned text, keyword tokens, token offsets, sentence spans and term counts, cached per text hash"""
+    text_hash = content_hash(text or "")
+
+    def build():
+        with span("text.tokenize", "text") as s:
+            result = _analyze(text or "", text_hash)
+            s.add(len(text or ""), tokens=len(result.tokens))
+        return result
+
+    return _ANALYSES.get_or_create(text_hash, build)
+
+
+@dataclass
+class TextPage:
+    """One viewable/editable slice of a document, with its stats computed once"""
+    label: str
+    header: str     # exact marker text before the body, so pages join back to the original text
+    body: str
+    chars: int = 0
+    words: int = 0
+    lines: int = 0
+
+    def __post_init__(self):
+        self.chars = len(self.body)
+        self.words = len(self.body.split())
+        self.lines = self.body.count("\n") + 1
+
+
+def _windows(body: str, max_chars: int):
+    """Cut a long body at line breaks into pieces of about max_chars"""
+    start = 0
+    while len(body) - start > max_chars:
+        cut = body.rfind("\n", start, start + max_chars) + 1
+        if cut <= start:
+            cut = start + max_chars
+        yield body[start:cut]
+        start = cut
+    yield body[start:]
+
+
+def split_pages(text: str, max_chars: int = VIEW_CHARS):
+    """Split text at its `--- Page N ---` markers (and long stretches into parts); join_text_pages inverts it"""
+    marks = list(PAGE_MARK_RE.finditer(text))
+    segments = [("", "", text[:marks[0].start()] if marks else text)]
+    for i, m in enumerate(marks):
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+        segments.append((f"Page {m.group(1)}", m.group(0), text[m.end():end]))
+    if marks and not segments[0][2].strip():
+        # Text before the first marker is only kept as a page when it has content
+        head = segments.pop(0)[2]
+        segments[0] = (segments[0][0], head + segments[0][1], segments[0][2])
+    pages = []
+    for label, header, body in segments:
+        parts = list(_windows(body, max_chars))
+        for n, part in enumerate(parts):
+            name = label or "Text"
+            if len(parts) > 1:
+                name = f"{name} (part {n + 1})"
+            pages.append(TextPage(name, header if n == 0 else "", part))
+    return pages
+
+
+def join_text_pages(pages) -> str:
+    return "".join(p.header + p.body for p in pages)
+
+
+def chunk_text(text: str, max_chars: int = 50_000):
+    """Split text at page markers, then sentence ends, into (offset, chunk) pieces of <= max_chars"""
+    chunks = []
+
+    def emit(start, end):
+        # Last resort for a single huge "sentence": hard split
+        for s in range(start, end, max_chars):
+            piece = text[s:min(end, s + max_chars)]
+            if piece.strip():
+                chunks.append((s, piece))
+
+    cuts = sorted({m.start() for m in PAGE_MARK_RE.finditer(text)} | {m.end() for m in SENTENCE_END_RE.finditer(text)})
+    start = last = 0
+    for cut in cuts + [len(text)]:
+        if cut - start > max_chars and last > start:
+            emit(start, last)
+            start = last
+        last = cut
+    emit(start, len(text))
+    return chunks
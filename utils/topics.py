@@ -0,0 +1,176 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import NMF, MiniBatchNMF
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from utils.cache import LRUCache
+from utils.text import analyze
+from utils.trace import span
+
+# Above this many sentences, factorize in mini-batches with bounded memory
+MINIBATCH_ROWS = 20_000
+
+# Sentence segmentation + TF-IDF per (text hash, max_features); only the factorization depends on k
+_TFIDF = LRUCache(max_entries=8)
+# Whole k-sweeps per (text hash, max_features, ks)
+_SWEEPS = LRUCache(max_entries=8)
+
+SWEEP_KS = tuple(range(2, 9))
+# Below this many sentences, fitting every k in-process beats shipping the matrix to a pool
+SWEEP_POOL_ROWS = 2_000
+# Sentences shorter than this are left out of the TF-IDF documents
+MIN_SENTENCE_WORDS = 5
+
+
+def tfidf_matrix(text, max_features=5000):
+    """(X, feature_names) for the text's sentences, or None when there is too little content"""
+    analysis = analyze(text)
+
+    def build():
+        docs = analysis.sentence_texts(min_words=MIN_SENTENCE_WORDS)
+        if len(docs) < 3:
+            return None
+        vec = TfidfVectorizer(max_features=max_features, stop_words="english", dtype=np.float32)
+        with span("topics.tfidf", "topics", sentences=len(docs)):
+            X = vec.fit_transform(docs)
+        if X.shape[0] < 2 or X.shape[1] < 2:
+            return None
+        return X, vec.get_feature_names_out()
+
+    return _TFIDF.get_or_create((analysis.text_hash, max_features), build)
+
+
+def factorize(X, feats, n_topics=5, random_state=42):
+    n_components = min(n_topics, max(2, X.shape[0] // 2), min(X.shape))
+    if X.shape[0] > MINIBATCH_ROWS:
+        nmf = MiniBatchNMF(n_components=n_components, random_state=random_state, init="nndsvda",
+                           batch_size=2048, max_iter=30)
+    else:
+        nmf = NMF(n_components=n_components, random_state=random_state, init="nndsvda", max_iter=400)
+    with span("topics.nmf", "topics", k=n_components, rows=X.shape[0]):
+        W = nmf.fit_transform(X); H = nmf.components_
+    top_ids = [comp.argsort()[::-1][:8] for comp in H]
+    topic_terms = [[feats[i] for i in ids] for ids in top_ids]
+    doc_topic = normalize(W, norm="l1", axis=1)
+    if sparse.issparse(doc_topic): weights = doc_topic.mean(axis=0).A1
+    else: weights = doc_topic.mean(axis=0).reshape(-1)
+    weights = weights/(weights.sum()+1e-12)
+    return {"topic_terms": topic_terms, "topic_weights": weights, "n_components": n_components,
+            "reconstruction_err": float(nmf.reconstruction_err_), "coherence": topic_coherence(X, top_ids)}
+
+
+def topic_coherence(X, top_ids):
+    """Mean UMass coherence of the topics' top terms over sentence co-occurrence (higher is better)"""
+    B = (X > 0).astype(np.float32).tocsc()
+    scores = []
+    for ids in top_ids:
+        sub = B[:, ids]
+        co = (sub.T @ sub).toarray()
+        df = np.diag(co)
+        pairs = [np.log((co[i, j] + 1.0) / max(df[j], 1.0)) for i in range(1, len(ids)) for j in range(i)]
+        if pairs:
+            scores.append(float(np.mean(pairs)))
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def topic_model(text, n_topics=5, max_features=5000):
+    tfidf = tfidf_matrix(text, max_features)
+    if tfidf is None: return None
+    X, feats = tfidf
+    return factorize(X, feats, n_topics)
+
+
+_worker_tfidf = None
+
+
+def _init_worker(X, feats):
+    # The matrix is shipped once per worker process, not once per k
+    global _worker_tfidf
+    _worker_tfidf = (X, feats)
+
+
+def _fit_k(k):
+    X, feats = _worker_tfidf
+    return k, factorize(X, feats, k)
+
+
+def _fit_k_with(X, feats, k):
+    # For a long-lived pool, which has no per-sweep initializer: the matrix travels with each k
+    return k, factorize(X, feats, k)
+
+
+def sweep_pool(max_workers: int = None) -> ProcessPoolExecutor:
+    """Long-lived pool for sweep_tfidf(pool=...); spawn, not fork, so it is safe to create from threaded servers"""
+    workers = min(len(SWEEP_KS), max_workers or os.cpu_count() or 1)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+
+
+def recommend_k(results: dict) -> int:
+    """Best balance of coherence (min-max scaled) and the knee of the reconstruction-error curve (half weight).
+
+    Error falls with every k, so it only counts through the knee: how far each k's
+    error lies below the straight line between the first and last k. Fits whose
+    k was capped by the matrix size repeat a smaller k and are not recommended.
+    """
+    ks = [k for k in sorted(results) if results[k].get("n_components", k) == k] or sorted(results)[:1]
+    coh = np.array([results[k]["coherence"] for k in ks])
+    err = np.array([results[k]["reconstruction_err"] for k in ks])
+    scale = lambda v: (v - v.min()) / (v.max() - v.min()) if v.max() > v.min() else np.zeros_like(v)
+    x = scale(np.array(ks, dtype=float))
+    knee = scale((1 - x) - scale(err)) if len(ks) > 2 else np.zeros(len(ks))
+    score = scale(coh) + 0.5 * knee
+    for k in results:
+        results[k]["score"] = None
+    for k, s in zip(ks, score):
+        results[k]["score"] = float(s)
+    return ks[int(np.argmax(score))]
+
+
+def sweep_topics(text, ks=SWEEP_KS, max_features=5000, max_workers=None):
+    """Fit every candidate k in parallel on the shared TF-IDF matrix.
+
+    Returns {"results": {k: topics}, "recommended": k}, or None when there is too little content.
+    """
+    tfidf = tfidf_matrix(text, max_features)
+    if tfidf is None:
+        return None
+    return sweep_tfidf(tfidf, (analyze(text).text_hash, max_features), ks, max_workers)
+
+
+def sweep_tfidf(tfidf, key, ks=SWEEP_KS, max_workers=None, pool=None):
+    """sweep_topics over a prepared (X, feature_names), cached under `key` (e.g. a corpus signature).
+
+    With `pool` (see sweep_pool) the fits run on it once the matrix has SWEEP_POOL_ROWS rows;
+    smaller matrices are fitted in-process.
+    """
+    key = (*key, tuple(ks))
+
+    def build():
+        X, feats = tfidf
+        if pool is not None:
+            results = None
+            if X.shape[0] >= SWEEP_POOL_ROWS:
+                try:
+                    results = dict(pool.map(_fit_k_with, *zip(*[(X, feats, k) for k in ks])))
+                except BrokenProcessPool:
+                    results = None  # a worker died; the caller should replace the pool
+            if results is None:
+                results = {k: factorize(X, feats, k) for k in ks}
+            return {"results": results, "recommended": recommend_k(results)}
+        workers = min(len(ks), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            results = {k: factorize(X, feats, k) for k in ks}
+        else:
+            # spawn, not fork: callers may be threaded (job queue, torch) and a forked child can inherit held locks
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(X, feats)) as pool_:
+                results = dict(pool_.map(_fit_k, ks))
+        return {"results": results, "recommended": recommend_k(results)}
+
+    return _SWEEPS.get_or_create(key, build)
@@ -0,0 +1,152 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The tracer spans are recorded into; unset means tracing is off and spans cost nothing
+_current = contextvars.ContextVar("data_vista_tracer", default=None)
+
+
+def peak_rss_mb():
+    """Process high-water RSS in MB (None where the platform does not report it)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+class Span:
+    __slots__ = ("name", "cat", "start_ns", "dur_ns", "tid", "bytes", "args", "rss_start", "peak_rss_mb")
+
+    def __init__(self, name, cat, args):
+        self.name, self.cat, self.args = name, cat, args
+        self.bytes = 0
+        self.tid = threading.get_ident()
+        self.start_ns = self.dur_ns = 0
+        self.rss_start = self.peak_rss_mb = None
+
+    def add(self, nbytes: int = 0, **args):
+        """Count bytes moved by this span and attach extra fields"""
+        self.bytes += nbytes
+        self.args.update(args)
+
+    @property
+    def seconds(self):
+        return self.dur_ns / 1e9
+
+    def as_dict(self):
+        return {"name": self.name, "cat": self.cat, "seconds": round(self.seconds, 6), "bytes": self.bytes,
+                "peak_rss_mb": self.peak_rss_mb and round(self.peak_rss_mb, 1),
+                "rss_growth_mb": self.peak_rss_mb and round(self.peak_rss_mb - self.rss_start, 1), **self.args}
+
+
+class _NullSpan:
+    def add(self, nbytes: int = 0, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Bounded, thread-safe record of finished spans for one session or batch document"""
+
+    def __init__(self, max_spans: int = 5000):
+        self.origin_ns = time.perf_counter_ns()
+        self.spans = deque(maxlen=max_spans)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        s = Span(name, cat, args)
+        s.rss_start = peak_rss_mb()
+        s.start_ns = time.perf_counter_ns()
+        try:
+            yield s
+        except BaseException as e:
+            s.args["error"] = type(e).__name__
+            raise
+        finally:
+            s.dur_ns = time.perf_counter_ns() - s.start_ns
+            s.peak_rss_mb = peak_rss_mb()
+            with self.lock:
+                self.spans.append(s)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.spans)
+
+    def clear(self):
+        with self.lock:
+            self.spans.clear()
+
+    def summary(self):
+        """Per span name: calls, total and max seconds, bytes and the highest RSS seen"""
+        rows = {}
+        for s in self.snapshot():
+            r = rows.setdefault(s.name, {"name": s.name, "calls": 0, "total_s": 0.0, "max_s": 0.0, "bytes": 0,
+                                         "peak_rss_mb": 0.0})
+            r["calls"] += 1
+            r["total_s"] += s.seconds
+            r["max_s"] = max(r["max_s"], s.seconds)
+            r["bytes"] += s.bytes
+            r["peak_rss_mb"] = max(r["peak_rss_mb"], s.peak_rss_mb or 0.0)
+        return sorted(rows.values(), key=lambda r: -r["total_s"])
+
+    def to_json(self) -> str:
+        return json.dumps({"summary": self.summary(), "spans": [s.as_dict() for s in self.snapshot()]}, default=str)
+
+    def to_chrome_trace(self) -> str:
+        """Trace Event Format, for chrome://tracing or ui.perfetto.dev"""
+        pid = os.getpid()
+        events = [{
+            "name": s.name, "cat": s.cat, "ph": "X", "pid": pid, "tid": s.tid,
+            "ts": (s.start_ns - self.origin_ns) / 1000, "dur": s.dur_ns / 1000,
+            "args": {k: v for k, v in s.as_dict().items() if k not in ("name", "cat", "seconds")},
+        } for s in self.snapshot()]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str)
+
+
+def bind(tracer: Tracer):
+    """Record spans from this thread (and the pools it hands work to) into `tracer`.
+
+    The binding is never reset: it lasts for the rest of the thread, i.e. one
+    Streamlit script run. Use activate() for a scoped binding.
+    """
+    return _current.set(tracer)
+
+
+@contextmanager
+def activate(tracer: Tracer):
+    token = _current.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current.reset(token)
+
+
+def span(name: str, cat: str = "stage", **args):
+    """Context manager timing a block into the active tracer; a no-op when none is bound"""
+    tracer = _current.get()
+    return tracer.span(name, cat, **args) if tracer is not None else NULL_SPAN
+
+
+def get_tracer(session_state) -> Tracer:
+    if "tracer" not in session_state:
+        session_state["tracer"] = Tracer()
+    return session_state["tracer"]
@@ -0,0 +1,34 @@
+import pandas as pd
+import streamlit as st
+
+from utils.trace import bind, get_tracer
+
+
+def trace_panel():
+    """Record this run's spans into the session tracer and show the totals in the sidebar"""
+    tracer = get_tracer(st.session_state)
+    bind(tracer)
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        rows = tracer.summary()
+        if not rows:
+            st.caption("No timed stages yet.")
+            return tracer
+        df = pd.DataFrame(rows)
+        df["MB"] = df.pop("bytes") / 2 ** 20
+        st.dataframe(
+            df.rename(columns={"name": "Stage", "calls": "Calls", "total_s": "Total s", "max_s": "Max s",
+                               "peak_rss_mb": "Peak RSS MB"}),
+            hide_index=True,
+            column_config={c: st.column_config.NumberColumn(format="%.2f") for c in ("Total s", "Max s", "MB", "Peak RSS MB")},
+        )
+        st.caption("Totals since the session started (or the last clear); updated on each rerun.")
+        # Exports serialize every span: built only when asked for, not on each rerun
+        if st.button("Prepare trace export"):
+            st.download_button("Download trace (JSON)", tracer.to_json(), file_name="data-vista-trace.json",
+                               mime="application/json")
+            st.download_button("Download Chrome trace", tracer.to_chrome_trace(),
+                               file_name="data-vista-trace.chrome.json", mime="application/json",
+                               help="Open in chrome://tracing or ui.perfetto.dev")
+        if st.button("Clear timings"):
+            tracer.clear()
+    return tracer